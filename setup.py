@@ -14,6 +14,7 @@ with open('README.md') as readme_file:
     readme = readme_file.read()
 
 requirements = [
+    'numpy',
 ]
 
 test_requirements = [
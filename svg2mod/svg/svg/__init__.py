@@ -2,7 +2,7 @@
 
 from .svg import *
 
-def parse(filename):
-    f = svg.Svg(filename)
+def parse(filename, stream=False, layers=None, transform=True):
+    f = svg.Svg(filename, stream, layers, transform)
     return f
 
@@ -21,9 +21,14 @@ related to SVG parsing. It can be reused outside the scope of SVG.
 
 import math
 import numbers
-import operator
 
-class Point:
+import numpy as np
+
+class Point(object):
+    # No per-instance __dict__: with its two floats, a Point takes 112 bytes
+    # instead of 400 on CPython 2.7 (96 instead of 192 on CPython 3.11)
+    __slots__ = ('x', 'y')
+
     def __init__(self, x=None, y=None):
         '''A Point is defined either by a tuple/list of length 2 or
            by 2 coordinates
@@ -38,6 +43,12 @@ class Point:
         >>> Point(('1', None))
         (1.000,0.000)
         '''
+        # Fast path: coordinates which are already floats
+        if type(x) is float and type(y) is float:
+            self.x = x
+            self.y = y
+            return
+
         if (isinstance(x, tuple) or isinstance(x, list)) and len(x) == 2:
             x,y = x
 
@@ -124,8 +135,10 @@ class Point:
         return Point(x,y)
 
 
-class Angle:
+class Angle(object):
     '''Define a trigonometric angle [of a vector] '''
+    __slots__ = ('angle', 'cos', 'sin')
+
     def __init__(self, arg):
         if isinstance(arg, numbers.Real):
         # We precompute sin and cos for rotations
@@ -151,8 +164,10 @@ class Angle:
     def __neg__(self):
         return Angle(Point(self.cos, -self.sin))
 
-class Segment:
+class Segment(object):
     '''A segment is an object defined by 2 points'''
+    __slots__ = ('start', 'end')
+
     def __init__(self, start, end):
         self.start = start
         self.end = end
@@ -160,9 +175,9 @@ class Segment:
     def __str__(self):
         return 'Segment from ' + str(self.start) + ' to ' + str(self.end)
 
-    def segments(self, precision=0):
+    def segments(self, precision=0, tolerance=None):
         ''' Segments is simply the segment start -> end'''
-        return [self.start, self.end]
+        return PointArray([self.start, self.end])
 
     def length(self):
         '''Segment length, Pythagoras theorem'''
@@ -212,12 +227,14 @@ class Segment:
         self.start = self.start.rot(angle)
         self.end = self.end.rot(angle)
 
-class Bezier:
+class Bezier(object):
     '''Bezier curve class
        A Bezier curve is defined by its control points
        Its dimension is equal to the number of control points
        Note that SVG only support dimension 3 and 4 Bezier curve, respectively
        Quadratic and Cubic Bezier curve'''
+    __slots__ = ('pts', 'dimension')
+
     def __init__(self, pts):
         self.pts = list(pts)
         self.dimension = len(pts)
@@ -256,21 +273,33 @@ class Bezier:
 
         return (Point(xmin,ymin), Point(xmax,ymax))
 
-    def segments(self, precision=0):
+    def segments(self, precision=0, tolerance=None):
         '''Return a polyline approximation ("segments") of the Bezier curve
-           precision is the minimum significative length of a segment'''
-        segments = []
-        # n is the number of Bezier points to draw according to precision
-        if precision != 0:
-            n = int(self.rlength() / precision) + 1
-        else:
-            n = 1000
-        #if n < 10: n = 10
-        if n > 1000 : n = 1000
-
-        for t in range(0, n+1):
-            segments.append(self._bezierN(float(t)/n))
-        return segments
+           precision is the minimum significative length of a segment
+           If a tolerance is given, the curve is instead adaptively
+           subdivided until no segment deviates from it by more than
+           tolerance (see flatten())'''
+        if tolerance:
+            return self.flatten(tolerance)
+        return bezier_segments([self], precision)[0]
+
+    # Subdivision depth limit of flatten(): at most 2**16 segments per curve
+    max_depth = 16
+
+    def flatten(self, tolerance):
+        '''Adaptive polyline approximation of the Bezier curve
+        The curve is recursively split in halves (de Casteljau) until the
+        control points of each piece are within tolerance of its chord.
+        As a Bezier curve lies within the convex hull of its control points,
+        the polyline never deviates from the curve by more than tolerance,
+        and flat parts of the curve get as few points as possible.
+        >>> Bezier([Point(0,0), Point(1,0), Point(2,0)]).flatten(0.1)
+        PointArray[(0.000,0.000), (2.000,0.000)]
+        >>> len(Bezier([Point(0,0), Point(0,1), Point(1,1)]).flatten(0.01))
+        13
+        '''
+        return flatten_bezier([p.coord() for p in self.pts], tolerance,
+                              self.max_depth)
 
     def _bezier1(self, p0, p1, t):
         '''Bezier curve, one dimension
@@ -304,7 +333,122 @@ class Bezier:
     def rotate(self, angle):
         self.pts = [x.rot(angle) for x in self.pts]
 
-class MoveTo:
+def bernstein(dimension, t):
+    '''Bernstein basis matrix of a Bezier curve of the given dimension
+    Row i holds the weights of each control point at "time" t[i], so that
+    bernstein(d, t).dot(control_points) evaluates the curve at every t.
+    >>> bernstein(3, [0, 0.5, 1]).tolist()
+    [[1.0, 0.0, 0.0], [0.25, 0.5, 0.25], [0.0, 0.0, 1.0]]
+    '''
+    degree = dimension - 1
+    t = np.asarray(t, dtype=float).reshape(-1, 1)
+    k = np.arange(dimension)
+    binomial = np.array([math.factorial(degree) //
+                         (math.factorial(i) * math.factorial(degree - i))
+                         for i in k], dtype=float)
+    return binomial * t ** k * (1 - t) ** (degree - k)
+
+def bezier_segments(beziers, precision=0):
+    '''Polyline approximations of several Bezier curves, as a list of
+    PointArrays. Each curve gets the same points as Bezier.segments(), but
+    all the curves of a given dimension are evaluated in one single
+    Bernstein matrix product.
+    >>> bezier_segments([Bezier([Point(0,0), Point(1,1), Point(2,0)])], 1)
+    [PointArray[(0.000,0.000), (0.667,0.444), (1.333,0.444), (2.000,0.000)]]
+    '''
+    ret = [None] * len(beziers)
+    by_dimension = {}
+    for i, b in enumerate(beziers):
+        by_dimension.setdefault(b.dimension, []).append(i)
+
+    for dimension, index in by_dimension.items():
+        # Control points of every curve: (curves, dimension, 2)
+        ctrl = np.array([[p.coord() for p in beziers[i].pts] for i in index],
+                        dtype=float).reshape(len(index), dimension, 2)
+        for i, c in zip(index, bezier_polylines(ctrl, precision)):
+            ret[i] = PointArray(c)
+
+    return ret
+
+def bezier_polylines(ctrl, precision=0):
+    '''Polyline approximations of Bezier curves of a same dimension, given
+    as an array of control points of shape (curves, dimension, 2): this is
+    the core of bezier_segments(), returning a list of (N,2) arrays'''
+    curves, dimension = ctrl.shape[:2]
+
+    # n is the number of Bezier points to draw according to precision
+    if precision != 0:
+        # Rough length, summed in the same order as Bezier.rlength()
+        lengths = np.sqrt((np.diff(ctrl, axis=1) ** 2).sum(axis=2))
+        rlength = np.zeros(curves)
+        for k in range(dimension - 2, -1, -1):
+            rlength += lengths[:, k]
+        n = (rlength / precision).astype(int) + 1
+        n = np.minimum(n, 1000)
+    else:
+        n = np.full(curves, 1000, dtype=int)
+
+    # Curve number and t of every sample, all curves laid end to end
+    counts = n + 1
+    curve = np.repeat(np.arange(curves), counts)
+    first = np.repeat(np.cumsum(counts) - counts, counts)
+    t = (np.arange(len(curve)) - first) / n[curve].astype(float)
+
+    coords = np.einsum('ij,ijk->ik', bernstein(dimension, t), ctrl[curve])
+    return np.split(coords, np.cumsum(counts)[:-1])
+
+def flatten_bezier(ctrl, tolerance, max_depth=16):
+    '''Adaptive polyline approximation of a Bezier curve given by its
+    control points (list of (x,y)), see Bezier.flatten()'''
+    ret = [ctrl[0]]
+    # Explicit stack of (control points, depth), left piece on top
+    stack = [(ctrl, 0)]
+    while stack:
+        ctrl, depth = stack.pop()
+        if depth >= max_depth or _flatness(ctrl) <= tolerance:
+            ret.append(ctrl[-1])
+            continue
+        left, right = _split_half(ctrl)
+        stack.append((right, depth + 1))
+        stack.append((left, depth + 1))
+    return PointArray(ret)
+
+def _split_half(ctrl):
+    '''Split Bezier control points (list of (x,y)) at t=0.5 with
+    de Casteljau's algorithm, return the control points of both halves'''
+    left = [ctrl[0]]
+    right = [ctrl[-1]]
+    while len(ctrl) > 1:
+        ctrl = [((x0 + x1) * 0.5, (y0 + y1) * 0.5)
+                for (x0, y0), (x1, y1) in zip(ctrl[:-1], ctrl[1:])]
+        left.append(ctrl[0])
+        right.append(ctrl[-1])
+    right.reverse()
+    return left, right
+
+def _flatness(ctrl):
+    '''Largest distance from the inner control points (list of (x,y)) to the
+    chord [first, last] control point. It bounds the distance between the
+    Bezier curve and its chord.'''
+    (x0, y0), (x1, y1) = ctrl[0], ctrl[-1]
+    dx = x1 - x0
+    dy = y1 - y0
+    l2 = dx * dx + dy * dy
+    d2 = 0.0
+    for x, y in ctrl[1:-1]:
+        px = x - x0
+        py = y - y0
+        # Projection of the control point on the chord, clamped to [0,1]
+        t = (px * dx + py * dy) / l2 if l2 > 0 else 0.0
+        t = min(max(t, 0.0), 1.0)
+        px -= t * dx
+        py -= t * dy
+        d2 = max(d2, px * px + py * py)
+    return math.sqrt(d2)
+
+class MoveTo(object):
+    __slots__ = ('dest',)
+
     def __init__(self, dest):
         self.dest = dest
 
@@ -322,22 +466,238 @@ class MoveTo:
         self.dest = self.dest.rot(angle)
 
 
+class PointArray(object):
+    '''A PointArray is a contiguous (N,2) buffer of coordinates, float64 by
+       default (dtype=None keeps the type of the given buffer). It behaves
+       like a read-only sequence of Points: Point objects are only created
+       when elements are accessed one by one, and a vertex takes 16 bytes
+       instead of a Point object.
+    >>> PointArray([(1,2), Point(3,4)])
+    PointArray[(1.000,2.000), (3.000,4.000)]
+    >>> PointArray([(1,2), (3,4)])[1]
+    (3.000,4.000)
+    >>> len(PointArray([(1,2), (3,4)])[1:])
+    1
+    >>> PointArray([(1,2)]) + [Point(3,4)]
+    PointArray[(1.000,2.000), (3.000,4.000)]
+    '''
+    __slots__ = ('coords',)
+
+    # Below this many points, plain Python beats the call overhead of numpy
+    short = 32
+
+    def __init__(self, points=(), dtype=float):
+        if isinstance(points, PointArray):
+            points = points.coords
+        elif not isinstance(points, np.ndarray):
+            points = [p.coord() if isinstance(p, Point) else p
+                      for p in points]
+        self.coords = np.asarray(points, dtype=dtype).reshape(-1, 2)
+
+    @staticmethod
+    def concatenate(arrays):
+        '''Join a sequence of PointArrays (or Point lists) into one'''
+        arrays = [a if isinstance(a, PointArray) else PointArray(a)
+                  for a in arrays]
+        if not arrays:
+            return PointArray()
+        return PointArray(np.concatenate([a.coords for a in arrays]),
+                          dtype=None)
+
+    def __len__(self):
+        return len(self.coords)
+
+    def _point(self, x, y):
+        p = Point(x, y)
+        if self.coords.dtype.kind != 'f':
+            # Keep integer coordinates (e.g. rounded decimils) as integers
+            p.x, p.y = x, y
+        return p
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PointArray(self.coords[index], dtype=None)
+        # tolist() gives native Python numbers, as the old Point lists had
+        x, y = self.coords[index].tolist()
+        return self._point(x, y)
+
+    def __iter__(self):
+        for x, y in self.coords.tolist():
+            yield self._point(x, y)
+
+    def __add__(self, other):
+        return PointArray.concatenate([self, other])
+
+    def __radd__(self, other):
+        return PointArray.concatenate([other, self])
+
+    def __eq__(self, other):
+        if not isinstance(other, PointArray):
+            try: other = PointArray(other)
+            except: return NotImplemented
+        return np.array_equal(self.coords, other.coords)
+
+    def __ne__(self, other):
+        eq = self.__eq__(other)
+        if eq is NotImplemented:
+            return eq
+        return not eq
+
+    def __repr__(self):
+        return 'PointArray[' + ', '.join(repr(p) for p in self) + ']'
+
+    @property
+    def x(self):
+        '''Abscissa of every point (a view, not a copy)'''
+        return self.coords[:, 0]
+
+    @property
+    def y(self):
+        '''Ordinate of every point (a view, not a copy)'''
+        return self.coords[:, 1]
+
+    def points(self):
+        '''Return the old-style list of Points'''
+        return list(self)
+
+    def bbox(self):
+        if len(self.coords) < 1:
+            return (Point(0, 0), Point(0, 0))
+        if len(self.coords) < self.short:
+            x, y = zip(*self.coords.tolist())
+            return (Point(min(x), min(y)), Point(max(x), max(y)))
+        xmin, ymin = self.coords.min(axis=0).tolist()
+        xmax, ymax = self.coords.max(axis=0).tolist()
+        return (Point(xmin, ymin), Point(xmax, ymax))
+
+
+def _line_distances(x, y, first, last):
+    '''Distances from the points first+1 .. last-1 to the line through
+    points first and last, with the same formulae as Segment.pdistance().
+    The distances are returned unscaled, along with the norm which they
+    must be divided by, as this does not change which one is the largest.'''
+    x0 = x[first]
+    y0 = y[first]
+    sx = x[last] - x0
+    sy = y[last] - y0
+    px = x[first+1:last]
+    py = y[first+1:last]
+    if sx == 0:
+        if sy == 0:
+            return np.sqrt((px - x0) ** 2 + (py - y0) ** 2), 1.0
+        return np.abs(x0 - px), 1.0
+    slope = sy / sx
+    dist = slope * px
+    dist -= py
+    dist += y0 - slope * x0
+    return np.abs(dist, out=dist), math.sqrt(slope ** 2 + 1)
+
+def simplify_mask(coords, epsilon, batch=4096):
+    '''Ramer-Douglas-Peucker algorithm on an (N,2) coordinate array
+    Return a boolean mask of the points to keep. Nothing is copied and
+    there is no recursion: index ranges with more than batch inner points
+    are split from an explicit stack, smaller ones are all processed
+    together, one level of the recursion at a time.
+    >>> simplify_mask([(0,0), (1,0.1), (2,0), (3,5), (4,0)], 0.5).tolist()
+    [True, False, True, True, True]
+    '''
+    coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+    n = len(coords)
+    keep = np.ones(n, dtype=bool)
+    if n < 3 or epsilon <= 0:
+        return keep
+
+    keep[1:-1] = False
+    x = np.ascontiguousarray(coords[:, 0])
+    y = np.ascontiguousarray(coords[:, 1])
+
+    # Pending ranges [first, last], both ends already kept
+    stack = [(0, n - 1)]
+    small = []
+    while stack:
+        first, last = stack.pop()
+        if last - first - 1 <= batch:
+            small.append((first, last))
+            continue
+        dist, norm = _line_distances(x, y, first, last)
+        # Furthest point from the segment (first one in case of a tie)
+        index = int(np.argmax(dist))
+        if dist[index] / norm > epsilon:
+            index += first + 1
+            keep[index] = True
+            stack.append((index, last))
+            stack.append((first, index))
+
+    if small:
+        first, last = np.array(small, dtype=int).reshape(-1, 2).T
+        _simplify_ranges(x, y, first, last, epsilon, keep)
+    return keep
+
+def _simplify_ranges(x, y, first, last, epsilon, keep):
+    '''Ramer-Douglas-Peucker algorithm over many index ranges at once,
+    see simplify_mask()'''
+    n = len(x)
+    while len(first):
+        # Only ranges with inner points need to be looked at
+        inner = last - first - 1
+        busy = inner > 0
+        first, last, inner = first[busy], last[busy], inner[busy]
+        if not len(first):
+            break
+
+        # Index of every inner point, and the range each one belongs to
+        rng = np.repeat(np.arange(len(first)), inner)
+        start = np.cumsum(inner) - inner
+        index = np.arange(1, len(rng) + 1) + (first - start)[rng]
+        px = x[index]
+        py = y[index]
+
+        # Same as _line_distances(), with the slope and intercept of each
+        # range computed once
+        x0 = x[first]
+        y0 = y[first]
+        sx = x[last] - x0
+        sy = y[last] - y0
+        vertical = sx == 0
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = sy / sx
+        slope[vertical] = 0
+        intercept = y0 - slope * x0
+        norm = np.sqrt(slope ** 2 + 1)
+        norm[vertical] = 1
+        dist = slope[rng] * px
+        dist -= py
+        dist += intercept[rng]
+        np.abs(dist, out=dist)
+
+        if vertical.any():
+            pv = vertical[rng]
+            dist[pv] = np.abs(x0[rng[pv]] - px[pv])
+            pp = (vertical & (sy == 0))[rng]
+            dist[pp] = np.sqrt((px[pp] - x0[rng[pp]]) ** 2 +
+                               (py[pp] - y0[rng[pp]]) ** 2)
+
+        # Furthest point of each range (first one in case of a tie)
+        dmax = np.maximum.reduceat(dist, start)
+        furthest = np.where(dist == dmax[rng], index, n)
+        furthest = np.minimum.reduceat(furthest, start)
+
+        # Split the ranges on their furthest point if it is too far
+        split = dmax / norm > epsilon
+        keep[furthest[split]] = True
+        first, last = (np.concatenate((first[split], furthest[split])),
+                       np.concatenate((furthest[split], last[split])))
+
 def simplify_segment(segment, epsilon):
-    '''Ramer-Douglas-Peucker algorithm'''
+    '''Ramer-Douglas-Peucker algorithm
+    segment is a PointArray or a list of Points, the result has the same
+    type (see simplify_mask())'''
     if len(segment) < 3 or epsilon <= 0:
         return segment[:]
 
-    l = Segment(segment[0], segment[-1]) # Longest segment
-
-    # Find the furthest point from the segment
-    index, maxDist = max([(i, l.pdistance(p)) for i,p in enumerate(segment)],
-            key=operator.itemgetter(1))
+    if isinstance(segment, PointArray):
+        return PointArray(segment.coords[simplify_mask(segment.coords,
+                                                       epsilon)], dtype=None)
 
-    if maxDist > epsilon:
-        # Recursively call with segment splited in 2 on its furthest point
-        r1 = simplify_segment(segment[:index+1], epsilon)
-        r2 = simplify_segment(segment[index:], epsilon)
-        # Remove redundant 'middle' Point
-        return r1[:-1] + r2
-    else:
-        return [segment[0], segment[-1]]
+    keep = simplify_mask([p.coord() for p in segment], epsilon)
+    return [p for p, k in zip(segment, keep) if k]
@@ -26,6 +26,7 @@ import xml.etree.ElementTree as etree
 import itertools
 import operator
 import json
+import numpy as np
 from .geometry import *
 
 
@@ -49,23 +50,61 @@ unit_convert = {
         '%' :  1 / 100.0   # 1 percent
         }
 
-class Transformable:
+class ChunkReader(object):
+    '''File wrapper handing the XML parser large chunks
+    Expat scans an incomplete token again for every chunk it is fed, which
+    gets quadratic on huge attributes (e.g. embedded base64 bitmaps) with
+    the 16 KiB reads of iterparse() or the 64 KiB reads of parse()'''
+    chunk_size = 1 << 20
+
+    def __init__(self, f):
+        self.f = f
+
+    def read(self, size=-1):
+        return self.f.read(max(size, self.chunk_size))
+
+class Transformable(object):
     '''Abstract class for objects that can be geometrically drawn & transformed'''
+    # Defaults shared by all the objects until they get their own, which
+    # keeps small objects small. They are replaced, never changed in place.
+    # The unit transformation matrix is set once Matrix is defined.
+    viewport = Point(800, 600) # default viewport is 800x600
+    # Last bounding box computed, with the matrix it was computed for
+    bbox_cache = None
+
     def __init__(self, elt=None):
         # a 'Transformable' is represented as a list of Transformable items
         self.items = []
         self.id = hex(id(self))
-        # Unit transformation matrix on init
-        self.matrix = Matrix()
-        self.viewport = Point(800, 600) # default viewport is 800x600
         if elt is not None:
             self.id = elt.get('id', self.id)
             # Parse transform attibute to update self.matrix
             self.getTransformations(elt)
 
-    def bbox(self):
-        '''Bounding box'''
-        bboxes = [x.bbox() for x in self.items]
+    def bbox(self, matrix=None):
+        '''Bounding box
+        If a matrix is given, the items are expected not to be transformed
+        yet (see Svg.parse()), and the bounding box is the one they have
+        once transformed by matrix and by their own matrices.
+        The bounding box is cached until the object is transformed, scaled,
+        translated or rotated, or until another matrix is given. Changing
+        the items or their matrices directly requires clearing bbox_cache.
+        Objects without items (paths, ellipses...) compute theirs from a
+        few points on each call instead of keeping one each'''
+        key = None if matrix is None else tuple(matrix.vect)
+        if self.bbox_cache is None or self.bbox_cache[0] != key:
+            self.bbox_cache = (key, self._bbox(matrix))
+        return self.bbox_cache[1]
+
+    def _bbox(self, matrix=None):
+        '''Bounding box, computed from scratch (see bbox())
+        Groups without anything to draw are left out'''
+        items = [x for x in self.items
+                 if not isinstance(x, Group) or not x.empty()]
+        if matrix is None:
+            bboxes = [x.bbox() for x in items]
+        else:
+            bboxes = [x.bbox(matrix * x.matrix) for x in items]
         if len( bboxes ) < 1:
             return (Point(0, 0), Point(0, 0))
         xmin = min([b[0].x for b in bboxes])
@@ -130,6 +169,7 @@ class Transformable:
                 self.matrix *= Matrix([1, tana, 0, 1, 0, 0])
 
     def transform(self, matrix=None):
+        self.bbox_cache = None
         if matrix is None:
             matrix = self.matrix
         else:
@@ -172,29 +212,47 @@ class Transformable:
 
     def flatten(self):
         '''Flatten the SVG objects nested list into a flat (1-D) list,
-        removing Groups'''
-        # http://rightfootin.blogspot.fr/2006/09/more-on-python-flatten.html
-        # Assigning a slice a[i:i+1] with a list actually replaces the a[i]
-        # element with the content of the assigned list
-        i = 0
-        flat = copy.deepcopy(self.items)
-        while i < len(flat):
-            while isinstance(flat[i], Group):
-                flat[i:i+1] = flat[i].items
-            i += 1
-        return flat
+        removing Groups. The objects are copies, see iterflatten() to walk
+        the original objects instead'''
+        return copy.deepcopy([x for x, matrix in self.iterflatten()])
+
+    def iterflatten(self, matrix=None):
+        '''Iterate over the SVG objects nested list in document order,
+        skipping Groups and without copying anything.
+        Each object is yielded with its accumulated transformation matrix,
+        i.e. the product of matrix (if given), of the matrices of the
+        object's ancestors, down to self, and of its own matrix'''
+        if matrix is None:
+            matrix = self.matrix
+        else:
+            matrix = matrix * self.matrix
+
+        # Explicit stack of (remaining items, matrix) for each open Group
+        stack = [(iter(self.items), matrix)]
+        while stack:
+            items, matrix = stack[-1]
+            for x in items:
+                if isinstance(x, Group):
+                    stack.append((iter(x.items), matrix * x.matrix))
+                    break
+                yield x, matrix * x.matrix
+            else:
+                stack.pop()
 
     def scale(self, ratio):
+        self.bbox_cache = None
         for x in self.items:
             x.scale(ratio)
         return self
 
     def translate(self, offset):
+        self.bbox_cache = None
         for x in self.items:
             x.translate(offset)
         return self
 
     def rotate(self, angle):
+        self.bbox_cache = None
         for x in self.items:
             x.rotate(angle)
         return self
@@ -204,41 +262,65 @@ class Svg(Transformable):
     # class Svg handles the <svg> tag
     # tag = 'svg'
 
-    def __init__(self, filename=None):
+    def __init__(self, filename=None, stream=False, layers=None,
+                 transform=True):
         Transformable.__init__(self)
         if filename:
-            self.parse(filename)
-
-    def parse(self, filename):
+            self.parse(filename, stream, layers, transform)
+
+    def parse(self, filename, stream=False, layers=None, transform=True):
+        '''Parse a SVG file
+        In stream mode, the file is read incrementally: objects are built as
+        soon as their XML element is complete and elements are released
+        right after, so that the XML tree is never entirely in memory.
+        If a collection of layer (group label) names is given, everything
+        outside of these layers is skipped, except groups.
+        Unless transform is False, the transformation matrices are applied
+        to all the objects. Otherwise, they are left as found in the file,
+        and each one can later be drawn with its accumulated matrix (see
+        iterflatten()) in a single pass over its points.'''
         self.filename = filename
-        tree = etree.parse(filename)
-        self.root = tree.getroot()
-        if self.root.tag != svg_ns + 'svg':
-            raise TypeError('file %s does not seem to be a valid SVG file', filename)
-
-        # Create a top Group to group all other items (useful for viewBox elt)
-        top_group = Group()
-        self.items.append(top_group)
-
-        # SVG dimension
-        width = self.xlength(self.root.get('width'))
-        height = self.ylength(self.root.get('height'))
-        # update viewport
-        top_group.viewport = Point(width, height)
-
-        # viewBox
-        if self.root.get('viewBox') is not None:
-            viewBox = re.findall(number_re, self.root.get('viewBox'))
-            sx = width / float(viewBox[2])
-            sy = height / float(viewBox[3])
-            tx = -float(viewBox[0])
-            ty = -float(viewBox[1])
-            top_group.matrix = Matrix([sx, 0, 0, sy, tx, ty])
-
-        # Parse XML elements hierarchically with groups <g>
-        top_group.append(self.root)
-
-        self.transform()
+        source = open(filename, 'rb')
+        try:
+            if stream:
+                events = etree.iterparse(ChunkReader(source),
+                                         events=('start', 'end'))
+                event, self.root = next(events)
+            else:
+                tree = etree.parse(ChunkReader(source))
+                self.root = tree.getroot()
+            if self.root.tag != svg_ns + 'svg':
+                raise TypeError('file %s does not seem to be a valid SVG file', filename)
+
+            # Create a top Group to group all other items (useful for viewBox elt)
+            top_group = Group()
+            self.items.append(top_group)
+
+            # SVG dimension
+            width = self.xlength(self.root.get('width'))
+            height = self.ylength(self.root.get('height'))
+            # update viewport
+            top_group.viewport = Point(width, height)
+
+            # viewBox
+            if self.root.get('viewBox') is not None:
+                viewBox = re.findall(number_re, self.root.get('viewBox'))
+                sx = width / float(viewBox[2])
+                sy = height / float(viewBox[3])
+                tx = -float(viewBox[0])
+                ty = -float(viewBox[1])
+                top_group.matrix = Matrix([sx, 0, 0, sy, tx, ty])
+
+            # Parse XML elements hierarchically with groups <g>
+            if stream:
+                top_group.iterappend(self.root, events, layers)
+            else:
+                top_group.append(self.root, layers)
+        finally:
+            source.close()
+
+        if transform:
+            self.transform()
 
     def title(self):
         t = self.root.find(svg_ns + 'title')
@@ -268,6 +350,10 @@ class Group(Transformable):
                 if id[ "name" ] == "label":
                     self.name = value
 
+    def empty(self):
+        '''Whether the group holds nothing but empty groups'''
+        return all(isinstance(x, Group) and x.empty() for x in self.items)
+
     @staticmethod
     def parse_name( tag ):
         m = re.match( r'({(.+)})?(.+)', tag )
@@ -276,12 +362,18 @@ class Group(Transformable):
             'name' : m.group( 3 ),
         }
 
-    def append(self, element):
+    def append(self, element, layers=None):
+        '''Parse the children of an XML element as items of this group
+        If a collection of layers is given, only the content of groups named
+        after one of them is parsed: elsewhere, only groups are created, to
+        find these layers.'''
         for elt in element:
             elt_class = svgClass.get(elt.tag, None)
             if elt_class is None:
                 print('No handler for element %s' % elt.tag)
                 continue
+            if layers is not None and elt.tag != svg_ns + 'g':
+                continue
             # instanciate elt associated class (e.g. <path>: item = Path(elt)
             item = elt_class(elt)
             # Apply group matrix to the newly created object
@@ -294,7 +386,62 @@ class Group(Transformable):
             self.items.append(item)
             # Recursively append if elt is a <g> (group)
             if elt.tag == svg_ns + 'g':
-                item.append(elt)
+                if layers is not None and item.name in layers:
+                    item.append(elt)
+                else:
+                    item.append(elt, layers)
+
+    def iterappend(self, element, events, layers=None):
+        '''Same as append(), from the (event, element) pairs of an
+        iterparse() whose 'start' event of the group element was just read.
+        Groups are created when they open, other items when they close,
+        then XML elements are cleared and removed from their parent, so
+        that only the open ones are kept.'''
+        # Open elements: a Group, the class of a pending item, or None for
+        # skipped elements and their content; with the layers to look for
+        # and the XML element
+        stack = [(self, layers, element)]
+        for event, elt in events:
+            if event == 'start':
+                parent, layers = stack[-1][:2]
+                if not isinstance(parent, Group):
+                    stack.append((None, None, elt))
+                    continue
+                elt_class = svgClass.get(elt.tag, None)
+                if elt_class is None:
+                    print('No handler for element %s' % elt.tag)
+                    stack.append((None, None, elt))
+                elif elt.tag == svg_ns + 'g':
+                    # Its items will be appended as they are read
+                    item = elt_class(elt)
+                    item.viewport = parent.viewport
+                    parent.items.append(item)
+                    if layers is not None and item.name in layers:
+                        layers = None
+                    stack.append((item, layers, elt))
+                elif layers is not None:
+                    # Outside of the layers to parse
+                    stack.append((None, None, elt))
+                else:
+                    # Instanciated once the element is complete
+                    stack.append((elt_class, None, elt))
+                continue
+
+            item = stack.pop()[0]
+            if not stack:
+                # End of the group element itself
+                break
+            if item is not None and not isinstance(item, Group):
+                # instanciate elt associated class (e.g. <path>: Path(elt)
+                parent = stack[-1][0]
+                item = item(elt)
+                item.viewport = parent.viewport
+                parent.items.append(item)
+            # Keep a top level <title> for Svg.title()
+            if len(stack) > 1 or elt.tag != svg_ns + 'title':
+                elt.clear()
+                # Its previous siblings are already removed: this is quick
+                stack[-1][2].remove(elt)
 
     def __repr__(self):
         return '<Group ' + self.id + " ({})".format( self.name ) + '>: ' + repr(self.items)
@@ -335,6 +482,18 @@ class Matrix:
             y = other.x * self.vect[1] + other.y * self.vect[3] + self.vect[5]
             return Point(x,y)
 
+        elif isinstance(other, PointArray):
+            if len(other) < PointArray.short:
+                a, b, c, d, e, f = self.vect
+                return PointArray(np.array(
+                        [(x * a + y * c + e, x * b + y * d + f)
+                         for x, y in other.coords.tolist()], dtype=float))
+
+            # All the points at once, with the same operations as for a Point
+            x = other.x * self.vect[0] + other.y * self.vect[2] + self.vect[4]
+            y = other.x * self.vect[1] + other.y * self.vect[3] + self.vect[5]
+            return PointArray(np.column_stack((x, y)))
+
         else:
             return NotImplemented
 
@@ -346,157 +505,264 @@ class Matrix:
     def ylength(self, y):
         return y * self.vect[3]
 
+# Unit transformation matrix, shared by default (see Transformable)
+Transformable.matrix = Matrix()
+
 
 COMMANDS = 'MmZzLlHhVvCcSsQqTtAa'
+# Number of arguments taken by each path command
+ARITY = {'M':2, 'Z':0, 'L':2, 'H':1, 'V':1, 'C':6, 'S':4, 'Q':4, 'T':2, 'A':7}
+COMMAND_SET = frozenset(COMMANDS)
+
+# A path data token is a command letter, a number or a whole arc command:
+# arc flags are single digits which need not be separated from what follows
+path_token_re = re.compile(r'[Aa][^%s]*|[%s]|%s' % (COMMANDS, COMMANDS, number_re))
+path_number_re = re.compile(number_re)
+path_arc_re = re.compile(r'[\s,]*(%s)[\s,]*(%s)[\s,]*(%s)[\s,]*([01])[\s,]*([01])'
+                         r'[\s,]*(%s)[\s,]*(%s)' % ((number_re,) * 5))
+path_blank_re = re.compile(r'[\s,]*$')
+
+def path_records(pathstr):
+    '''Scan path data in a single pass, yielding a (command, arguments)
+       record for each command letter, arguments being the list of all the
+       numbers up to the next command letter (i.e. including the ones of
+       implicitly repeated commands).
+       An arc record whose arguments cannot be read ends with the arguments
+       read so far, so its length is not a multiple of 7.
+    >>> list(path_records('M1,2 3-4.5.5zm1e1 0'))
+    [('M', [1.0, 2.0, 3.0, -4.5, 0.5]), ('z', []), ('m', [10.0, 0.0])]
+    >>> list(path_records('a1,1 0 0110,10')) == [('a', [1, 1, 0, 0, 1, 10, 10])]
+    True
+    '''
+    tokens = path_token_re.findall(pathstr)
+    if tokens and tokens[0][0] not in COMMAND_SET:
+        raise ValueError("No command found at the start of path data")
+
+    records = []
+    for token in tokens:
+        if token[0] in COMMAND_SET:
+            numbers = []
+            append = numbers.append
+            records.append((token, numbers))
+        else:
+            append(float(token))
+
+    for command, numbers in records:
+        if len(command) == 1:
+            yield command, numbers
+            continue
+
+        # Arc, the token holds its arguments
+        args = command[1:]
+        values = []
+        pos = 0
+        while not path_blank_re.match(args, pos):
+            arc = path_arc_re.match(args, pos)
+            if arc is None:
+                values.extend(map(float,
+                        path_number_re.findall(args, pos)[:6]))
+                break
+            values.extend(map(float, arc.groups()))
+            pos = arc.end()
+        yield command[0], values
+
 
 class Path(Transformable):
-    '''SVG <path>'''
+    '''SVG <path>
+    The items of a path (MoveTo, Segment and Bezier) are not stored as
+    objects: their points are laid end to end in a single PointArray,
+    points, and sizes holds the number of points of each item (1 for a
+    MoveTo, 2 for a Segment, 3 or 4 for a Bezier curve). The items
+    property builds the objects when they are asked for.'''
     # class Path handles the <path> tag
     tag = 'path'
 
+    # Points of a path without items, shared as the points are only ever
+    # replaced, never changed in place
+    empty = PointArray()
+
     def __init__(self, elt=None):
         Transformable.__init__(self, elt)
         if elt is not None:
             self.style = elt.get('style')
             self.parse(elt.get('d'))
 
-    def parse(self, pathstr):
-        """Parse path string and build elements list"""
+    def _get_items(self):
+        items = []
+        points = iter(self.points)
+        for size in self.sizes:
+            if size == 1:
+                items.append(MoveTo(next(points)))
+            elif size == 2:
+                items.append(Segment(next(points), next(points)))
+            else:
+                items.append(Bezier([next(points) for i in range(size)]))
+        return items
+
+    def _set_items(self, items):
+        if not items:
+            # Set by Transformable.__init__()
+            self.points = Path.empty
+            self.sizes = []
+            return
+        coords = []
+        self.sizes = []
+        for x in items:
+            if isinstance(x, MoveTo):
+                pts = [x.dest]
+            elif isinstance(x, Segment):
+                pts = [x.start, x.end]
+            else:
+                pts = x.pts
+            coords.extend(p.coord() for p in pts)
+            self.sizes.append(len(pts))
+        self.points = PointArray(coords)
 
-        pathlst = re.findall(number_re + r"|\ *[%s]\ *" % COMMANDS, pathstr)
+    items = property(_get_items, _set_items, doc='''List of the MoveTo,
+        Segment and Bezier items of the path, built from its points: changing
+        the list does not change the path, assigning a new list does''')
 
-        pathlst.reverse()
+    def parse(self, pathstr):
+        """Parse path string and build the points of its items"""
 
         command = None
-        current_pt = Point(0,0)
-        start_pt = None
-
-        while pathlst:
-            if pathlst[-1].strip() in COMMANDS:
-                last_command = command
-                command = pathlst.pop().strip()
-                absolute = (command == command.upper())
-                command = command.upper()
-            else:
-                if command is None:
-                    raise ValueError("No command found at %d" % len(pathlst))
+        # Current point, and start of the current subpath
+        x0 = y0 = 0.0
+        start = None
+        coords = []
+        sizes = []
+
+        for command_letter, args in path_records(pathstr):
+            last_command = command
+            command = command_letter.upper()
+            absolute = (command == command_letter)
+            arity = ARITY[command]
+
+            if command == 'Z':
+            # Close Path
+                if start is None:
+                    raise ValueError("Close path before any move to")
+                coords += (x0, y0) + start
+                sizes.append(2)
+                continue
+
+            if command != 'A' and (not args or len(args) % arity):
+                raise ValueError("Wrong number of arguments for %s: %d"
+                        % (command_letter, len(args)))
+            i = 0
 
             if command == 'M':
             # MoveTo
-                x = pathlst.pop()
-                y = pathlst.pop()
-                pt = Point(x, y)
-                if absolute:
-                    current_pt = pt
-                else:
-                    current_pt += pt
-                start_pt = current_pt
-
-                self.items.append(MoveTo(current_pt))
+                x, y = args[0], args[1]
+                if not absolute:
+                    x += x0
+                    y += y0
+                x0, y0 = x, y
+                start = (x, y)
+                coords += start
+                sizes.append(1)
+                i = 2
 
                 # MoveTo with multiple coordinates means LineTo
                 command = 'L'
 
-            elif command == 'Z':
-            # Close Path
-                l = Segment(current_pt, start_pt)
-                self.items.append(l)
-
-
-            elif command in 'LHV':
-            # LineTo, Horizontal & Vertical line
-                # extra coord for H,V
-                if absolute:
-                    x,y = current_pt.coord()
-                else:
-                    x,y = (0,0)
-
-                if command in 'LH':
-                    x = pathlst.pop()
-                if command in 'LV':
-                    y = pathlst.pop()
-
-                pt = Point(x, y)
-                if not absolute:
-                    pt += current_pt
-
-                self.items.append(Segment(current_pt, pt))
-                current_pt = pt
-
-            elif command in 'CQ':
-                dimension = {'Q':3, 'C':4}
-                bezier_pts = []
-                bezier_pts.append(current_pt)
-                for i in range(1,dimension[command]):
-                    x = pathlst.pop()
-                    y = pathlst.pop()
-                    pt = Point(x, y)
+            if command == 'L':
+            # LineTo
+                sizes += [2] * ((len(args) - i) // 2)
+                for i in range(i, len(args), 2):
+                    x, y = args[i], args[i+1]
                     if not absolute:
-                        pt += current_pt
-                    bezier_pts.append(pt)
-
-                self.items.append(Bezier(bezier_pts))
-                current_pt = pt
+                        x += x0
+                        y += y0
+                    coords += (x0, y0, x, y)
+                    x0, y0 = x, y
+
+            elif command == 'H':
+            # Horizontal line
+                for x in args:
+                    if not absolute:
+                        x += x0
+                    coords += (x0, y0, x, y0)
+                    x0 = x
+                sizes += [2] * len(args)
+
+            elif command == 'V':
+            # Vertical line
+                for y in args:
+                    if not absolute:
+                        y += y0
+                    coords += (x0, y0, x0, y)
+                    y0 = y
+                sizes += [2] * len(args)
+
+            elif command == 'C':
+                for i in range(0, len(args), 6):
+                    x1, y1, x2, y2, x, y = args[i:i+6]
+                    if not absolute:
+                        x1 += x0
+                        y1 += y0
+                        x2 += x0
+                        y2 += y0
+                        x += x0
+                        y += y0
+                    coords += (x0, y0, x1, y1, x2, y2, x, y)
+                    x0, y0 = x, y
+                sizes += [4] * (len(args) // 6)
+
+            elif command == 'Q':
+                for i in range(0, len(args), 4):
+                    x1, y1, x, y = args[i:i+4]
+                    if not absolute:
+                        x1 += x0
+                        y1 += y0
+                        x += x0
+                        y += y0
+                    coords += (x0, y0, x1, y1, x, y)
+                    x0, y0 = x, y
+                sizes += [3] * (len(args) // 4)
 
             elif command in 'TS':
-                # number of points to read
-                nbpts = {'T':1, 'S':2}
                 # the control point, from previous Bezier to mirror
                 ctrlpt = {'T':1, 'S':2}
                 # last command control
                 last = {'T': 'QT', 'S':'CS'}
 
-                bezier_pts = []
-                bezier_pts.append(current_pt)
-
-                if last_command in last[command]:
-                    pt0 = self.items[-1].control_point(ctrlpt[command])
-                else:
-                    pt0 = current_pt
-                pt1 = current_pt
-                # Symetrical of pt1 against pt0
-                bezier_pts.append(pt1 + pt1 - pt0)
-
-                for i in range(0,nbpts[command]):
-                    x = pathlst.pop()
-                    y = pathlst.pop()
-                    pt = Point(x, y)
-                    if not absolute:
-                        pt += current_pt
-                    bezier_pts.append(pt)
-
-                self.items.append(Bezier(bezier_pts))
-                current_pt = pt
+                for i in range(0, len(args), arity):
+                    if last_command in last[command]:
+                        # Control point of the last item
+                        j = len(coords) - 2 * (sizes[-1] - ctrlpt[command])
+                        px, py = coords[j], coords[j+1]
+                    else:
+                        px, py = x0, y0
+                    # Symetrical of the current point against it
+                    bezier = [x0, y0, x0 + x0 - px, y0 + y0 - py]
+
+                    for j in range(i, i + arity, 2):
+                        x, y = args[j], args[j+1]
+                        if not absolute:
+                            x += x0
+                            y += y0
+                        bezier += (x, y)
+
+                    coords += bezier
+                    sizes.append(len(bezier) // 2)
+                    x0, y0 = x, y
 
             elif command == 'A':
-                rx = pathlst.pop()
-                ry = pathlst.pop()
-                xrot = pathlst.pop()
-                # Arc flags are not necesarily sepatated numbers
-                flags = pathlst.pop().strip()
-                large_arc_flag = flags[0]
-                if large_arc_flag not in '01':
-                    print('Arc parsing failure')
-                    break
-
-                if len(flags) > 1:  flags = flags[1:].strip()
-                else:               flags = pathlst.pop().strip()
-                sweep_flag = flags[0]
-                if sweep_flag not in '01':
+                for i in range(0, len(args) - len(args) % arity, arity):
+                    arc = args[i:i+arity]
+                    # TODO
+                    print('ARC: ' + ', '.join(format(v, 'g') for v in arc))
+#                    rx, ry, xrot, large_arc_flag, sweep_flag, x, y = arc
+#                    items.append(
+#                        Arc(rx, ry, xrot, large_arc_flag, sweep_flag, Point(x, y)))
+
+                if len(args) % arity:
                     print('Arc parsing failure')
                     break
 
-                if len(flags) > 1:  x = flags[1:]
-                else:               x = pathlst.pop()
-                y = pathlst.pop()
-                # TODO
-                print('ARC: ' +
-                    ', '.join([rx, ry, xrot, large_arc_flag, sweep_flag, x, y]))
-#                self.items.append(
-#                    Arc(rx, ry, xrot, large_arc_flag, sweep_flag, Point(x, y)))
-
-            else:
-                pathlst.pop()
+        self.points = PointArray(np.array(coords, dtype=float))
+        self.sizes = sizes
 
     def __str__(self):
         return '\n'.join(str(x) for x in self.items)
@@ -504,21 +770,97 @@ class Path(Transformable):
     def __repr__(self):
         return '<Path ' + self.id + '>'
 
-    def segments(self, precision=0):
+    def vertices(self):
+        '''All the points of the items (MoveTo destinations, Segment ends
+           and Bezier control points) laid end to end in a PointArray'''
+        return self.points[:]
+
+    def bbox(self, matrix=None):
+        '''Bounding box, see Transformable.bbox()'''
+        if matrix is None:
+            return self.points.bbox()
+        return (matrix * self.points).bbox()
+
+    def transform(self, matrix=None):
+        if matrix is None:
+            matrix = self.matrix
+        else:
+            matrix *= self.matrix
+        self.points = matrix * self.points
+
+    def scale(self, ratio):
+        self.points = PointArray(self.points.coords * ratio)
+        return self
+
+    def translate(self, offset):
+        if not isinstance(offset, Point):
+            offset = Point(offset)
+        self.points = PointArray(self.points.coords + offset.coord())
+        return self
+
+    def rotate(self, angle):
+        if not isinstance(angle, Angle):
+            angle = Angle(angle)
+        x, y = self.points.x, self.points.y
+        self.points = PointArray(np.column_stack(
+                (x * angle.cos - y * angle.sin, x * angle.sin + y * angle.cos)))
+        return self
+
+    def segments(self, precision=0, tolerance=None, matrix=None):
         '''Return a list of segments, each segment is ended by a MoveTo.
-           A segment is a list of Points'''
+           A segment is a PointArray
+           Curves are flattened according to precision, or adaptively if a
+           tolerance (max deviation, in user units) is given
+           If a matrix is given, all the points are first transformed by it
+           in a single pass (the path is left untouched), so that curves are
+           flattened in the transformed coordinates'''
+        coords = self.points
+        if matrix is not None:
+            coords = matrix * coords
+        coords = coords.coords
+
+        # Pieces of each segment: a slice of coords for a run of Segments,
+        # the polyline of a Bezier curve otherwise
         ret = []
-        # group items separated by MoveTo
-        for moveTo, group in itertools.groupby(self.items,
-                lambda x: isinstance(x, MoveTo)):
-            # Use only non MoveTo item
-            if not moveTo:
-                # Generate segments for each relevant item
-                seg = [x.segments(precision) for x in group]
-                # Merge all segments into one
-                ret.append(list(itertools.chain.from_iterable(seg)))
-
-        return ret
+        pieces = None
+        beziers = {}
+        offset = 0
+        for size in self.sizes:
+            if size == 1:
+                pieces = None
+            else:
+                if pieces is None:
+                    pieces = []
+                    ret.append(pieces)
+                if size == 2:
+                    if pieces and type(pieces[-1]) is slice \
+                            and pieces[-1].stop == offset:
+                        pieces[-1] = slice(pieces[-1].start, offset + 2)
+                    else:
+                        pieces.append(slice(offset, offset + 2))
+                elif tolerance:
+                    pieces.append(flatten_bezier(
+                            coords[offset:offset+size].tolist(), tolerance,
+                            Bezier.max_depth).coords)
+                else:
+                    beziers.setdefault(size, []).append(
+                            (offset, pieces, len(pieces)))
+                    pieces.append(None)
+            offset += size
+
+        # Flatten all the other Bezier curves of the path in a single batch
+        for dimension, index in beziers.items():
+            # Control points of every curve: (curves, dimension, 2)
+            ctrl = coords[np.add.outer([i[0] for i in index],
+                                       np.arange(dimension))]
+            for (offset, pieces, i), c in zip(index,
+                                              bezier_polylines(ctrl, precision)):
+                pieces[i] = c
+
+        # Merge all the pieces of each segment
+        return [PointArray(np.concatenate([coords[p] if type(p) is slice
+                                           else p for p in pieces]), dtype=None)
+                for pieces in ret]
 
     def simplify(self, precision):
         '''Simplify segment with precision:
@@ -546,10 +888,15 @@ class Ellipse(Transformable):
     def __repr__(self):
         return '<Ellipse ' + self.id + '>'
 
-    def bbox(self):
+    def bbox(self, matrix=None):
         '''Bounding box'''
-        pmin = self.center - Point(self.rx, self.ry)
-        pmax = self.center + Point(self.rx, self.ry)
+        center, rx, ry = self.center, self.rx, self.ry
+        if matrix is not None:
+            center = matrix * center
+            rx = matrix.xlength(rx)
+            ry = matrix.ylength(ry)
+        pmin = center - Point(rx, ry)
+        pmax = center + Point(rx, ry)
         return (pmin, pmax)
 
     def transform(self, matrix):
@@ -624,12 +971,15 @@ class Rect(Transformable):
     def __repr__(self):
         return '<Rect ' + self.id + '>'
 
-    def bbox(self):
+    def bbox(self, matrix=None):
         '''Bounding box'''
-        xmin = min([p.x for p in (self.P1, self.P2)])
-        xmax = max([p.x for p in (self.P1, self.P2)])
-        ymin = min([p.y for p in (self.P1, self.P2)])
-        ymax = max([p.y for p in (self.P1, self.P2)])
+        pts = (self.P1, self.P2)
+        if matrix is not None:
+            pts = [matrix * p for p in pts]
+        xmin = min([p.x for p in pts])
+        xmax = max([p.x for p in pts])
+        ymin = min([p.y for p in pts])
+        ymax = max([p.y for p in pts])
 
         return (Point(xmin,ymin), Point(xmax,ymax))
 
@@ -666,12 +1016,15 @@ class Line(Transformable):
     def __repr__(self):
         return '<Line ' + self.id + '>'
 
-    def bbox(self):
+    def bbox(self, matrix=None):
         '''Bounding box'''
-        xmin = min([p.x for p in (self.P1, self.P2)])
-        xmax = max([p.x for p in (self.P1, self.P2)])
-        ymin = min([p.y for p in (self.P1, self.P2)])
-        ymax = max([p.y for p in (self.P1, self.P2)])
+        pts = (self.P1, self.P2)
+        if matrix is not None:
+            pts = [matrix * p for p in pts]
+        xmin = min([p.x for p in pts])
+        xmax = max([p.x for p in pts])
+        ymin = min([p.y for p in pts])
+        ymax = max([p.y for p in pts])
 
         return (Point(xmin,ymin), Point(xmax,ymax))
 
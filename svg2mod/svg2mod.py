@@ -3,12 +3,24 @@
 from __future__ import absolute_import
 
 import argparse
+import copy
 import datetime
+import heapq
+import itertools
+import math
+import multiprocessing
 import os
 from pprint import pformat, pprint
+import numpy as np
 import re
 import svg2mod.svg as svg
 import sys
+import tempfile
+
+try:
+    from cStringIO import StringIO
+except ImportError:
+    from io import StringIO
 
 
 #----------------------------------------------------------------------------
@@ -33,11 +45,37 @@ def main():
                 #" pretty output format"
             #)
 
+    if args.tolerance is not None and args.tolerance <= 0:
+        print( "Error: the curve tolerance must be positive" )
+        sys.exit( -1 )
+
+    if args.jobs < 0:
+        print( "Error: the number of jobs cannot be negative" )
+        sys.exit( -1 )
+
+    if args.decimals is not None and args.decimals < 0:
+        print( "Error: the number of decimals cannot be negative" )
+        sys.exit( -1 )
+
+    if args.points_per_line < 1:
+        print( "Error: at least one point per line is needed" )
+        sys.exit( -1 )
+
+    # Only parse the layers which may be exported:
+    if args.layers is not None:
+        layers = [ name.strip() for name in args.layers.split( "," ) ]
+    elif pretty:
+        layers = Svg2ModExportPretty.layer_map.keys()
+    else:
+        layers = Svg2ModExportLegacy.layer_map.keys()
+
     # Import the SVG:
     imported = Svg2ModImport(
         args.input_file_name,
         args.module_name,
-        args.module_value
+        args.module_value,
+        stream = args.stream,
+        layers = set( layers ),
     )
 
     # Pick an output file name if none was provided:
@@ -63,6 +101,17 @@ def main():
             args.scale_factor,
             args.precision,
             args.dpi,
+            include_reverse = args.reverse,
+            tolerance = args.tolerance,
+            holes = args.holes,
+            compose = args.compose,
+            union = args.union,
+            validate = args.validate,
+            jobs = args.jobs,
+            timestamp = args.timestamp,
+            simplify = args.simplify,
+            decimals = args.decimals,
+            points_per_line = args.points_per_line,
         )
 
     else:
@@ -79,6 +128,14 @@ def main():
                     args.precision,
                     args.dpi,
                     include_reverse = not args.front_only,
+                    tolerance = args.tolerance,
+                    holes = args.holes,
+                    compose = args.compose,
+                    union = args.union,
+                    validate = args.validate,
+                    jobs = args.jobs,
+                    timestamp = args.timestamp,
+                    simplify = args.simplify,
                 )
 
             except Exception as e:
@@ -96,16 +153,33 @@ def main():
                 use_mm = use_mm,
                 dpi = args.dpi,
                 include_reverse = not args.front_only,
+                tolerance = args.tolerance,
+                holes = args.holes,
+                compose = args.compose,
+                union = args.union,
+                validate = args.validate,
+                jobs = args.jobs,
+                timestamp = args.timestamp,
+                simplify = args.simplify,
             )
 
     # Export the footprint:
     exported.write()
 
+    if args.validate == 'fail' and exported.crossings > 0:
+        print( "Error: {} polygon edge crossings in {}".format(
+            exported.crossings, args.output_file_name
+        ) )
+        sys.exit( -1 )
+
 
 #----------------------------------------------------------------------------
 
 class LineSegment( object ):
 
+    __slots__ = ( 'p', 'q' )
+
+
     #------------------------------------------------------------------------
 
     @staticmethod
@@ -205,6 +279,75 @@ class LineSegment( object ):
         )
 
 
+    #------------------------------------------------------------------------
+
+    @staticmethod
+    def _on_segments( p, q, r ):
+        """ Same as _on_segment() for arrays of points (as [..., 2] arrays
+            broadcast together). """
+
+        return (
+            ( q[ ..., 0 ] <= np.maximum( p[ ..., 0 ], r[ ..., 0 ] ) ) &
+            ( q[ ..., 0 ] >= np.minimum( p[ ..., 0 ], r[ ..., 0 ] ) ) &
+            ( q[ ..., 1 ] <= np.maximum( p[ ..., 1 ], r[ ..., 1 ] ) ) &
+            ( q[ ..., 1 ] >= np.minimum( p[ ..., 1 ], r[ ..., 1 ] ) )
+        )
+
+
+    #------------------------------------------------------------------------
+
+    @staticmethod
+    def _orientations( p, q, r ):
+        """ Same as _orientation() for arrays of points (as [..., 2] arrays
+            broadcast together), with -1 instead of 2 for counterclockwise. """
+
+        val = (
+            ( q[ ..., 1 ] - p[ ..., 1 ] ) * ( r[ ..., 0 ] - q[ ..., 0 ] ) -
+            ( q[ ..., 0 ] - p[ ..., 0 ] ) * ( r[ ..., 1 ] - q[ ..., 1 ] )
+        )
+
+        return np.sign( val )
+
+
+    #------------------------------------------------------------------------
+
+    @staticmethod
+    def connections( p, q, r, s ):
+        """ Same as connects() for all the line segments 'pq' and 'rs'
+            given as arrays of end points (as [..., 2] arrays broadcast
+            together, e.g. one line segment against many). """
+
+        def same( a, b ):
+            return ( a[ ..., 0 ] == b[ ..., 0 ] ) & ( a[ ..., 1 ] == b[ ..., 1 ] )
+
+        return same( q, r ) | same( q, s ) | same( p, r ) | same( p, s )
+
+
+    #------------------------------------------------------------------------
+
+    @staticmethod
+    def intersections( p, q, r, s ):
+        """ Same as intersects() for all the line segments 'pq' and 'rs'
+            given as arrays of end points (as [..., 2] arrays broadcast
+            together, e.g. one line segment against many). """
+
+        orientation = LineSegment._orientations
+        on_segment = LineSegment._on_segments
+
+        o1 = orientation( p, q, r )
+        o2 = orientation( p, q, s )
+        o3 = orientation( r, s, p )
+        o4 = orientation( r, s, q )
+
+        return (
+            ( ( o1 != o2 ) & ( o3 != o4 ) ) |
+            ( ( o1 == 0 ) & on_segment( p, r, q ) ) |
+            ( ( o2 == 0 ) & on_segment( p, s, q ) ) |
+            ( ( o3 == 0 ) & on_segment( r, p, s ) ) |
+            ( ( o4 == 0 ) & on_segment( r, q, s ) )
+        )
+
+
     #------------------------------------------------------------------------
 
     def q_next( self, q ):
@@ -217,411 +360,1948 @@ class LineSegment( object ):
 
 #----------------------------------------------------------------------------
 
-class PolygonSegment( object ):
+class BoxIndex( object ):
 
-    #------------------------------------------------------------------------
+    """ Uniform grid over some bounding boxes, so that a point or a line
+        segment only needs to be checked against the boxes lying in the grid
+        cells it covers, instead of against every box. """
 
-    def __init__( self, points ):
+    __slots__ = (
+        'boxes', 'origin', 'cell_size', 'columns', 'rows',
+        'cell_start', 'cell_boxes',
+    )
 
-        self.points = points
 
-        if len( points ) < 3:
-            print(
-                "Warning:"
-                " Path segment has only {} points (not a polygon?)".format(
-                    len( points )
-                )
-            )
+    #------------------------------------------------------------------------
 
+    # The boxes are given as an (N,4) array of min x, min y, max x, max y.
+    def __init__( self, boxes ):
 
-    #------------------------------------------------------------------------
+        self.boxes = boxes = np.asarray( boxes, dtype = float ).reshape( -1, 4 )
 
-    # KiCad will not "pick up the pen" when moving between a polygon outline
-    # and holes within it, so we search for a pair of points connecting the
-    # outline (self) to the hole such that the connecting segment will not
-    # cross the visible inner space within any hole.
-    def _find_insertion_point( self, hole, holes ):
+        if len( boxes ) < 1:
+            self.cell_start = None
+            return
 
-        #print( "      Finding insertion point.  {} holes".format( len( holes ) ) )
+        # About as many cells as boxes, over the bounding box of all boxes:
+        self.origin = boxes[ :, : 2 ].min( axis = 0 )
+        size = boxes[ :, 2 : ].max( axis = 0 ) - self.origin
+        self.columns = self.rows = int( math.sqrt( len( boxes ) ) ) + 1
+        self.cell_size = np.where( size > 0, size / self.columns, 1.0 )
+
+        low = self._cell( boxes[ :, : 2 ] )
+        high = self._cell( boxes[ :, 2 : ] )
 
-        # Try the next point on the container:
-        for cp in range( len( self.points ) ):
-            container_point = self.points[ cp ]
+        # Register each box in all the cells it covers:
+        span = high - low + 1
+        counts = span[ :, 0 ] * span[ :, 1 ]
+        box = np.repeat( np.arange( len( boxes ) ), counts )
+        k = np.arange( len( box ) ) - np.repeat( np.cumsum( counts ) - counts, counts )
+        column = low[ box, 0 ] + k // span[ box, 1 ]
+        row = low[ box, 1 ] + k % span[ box, 1 ]
+        cell = column * self.rows + row
 
-            #print( "      Trying container point {}".format( cp ) )
+        order = np.argsort( cell, kind = 'mergesort' )
+        self.cell_boxes = box[ order ]
+        self.cell_start = np.searchsorted(
+            cell[ order ], np.arange( self.columns * self.rows + 1 )
+        )
 
-            # Try the next point on the hole:
-            for hp in range( len( hole.points ) - 1 ):
-                hole_point = hole.points[ hp ]
 
-                #print( "      Trying hole point {}".format( cp ) )
+    #------------------------------------------------------------------------
 
-                bridge = LineSegment( container_point, hole_point )
+    # Grid cell (column, row) of each of the given (N,2) coordinates.
+    def _cell( self, coords ):
 
-                # Check for intersection with each other hole:
-                for other_hole in holes:
+        cell = np.floor( ( coords - self.origin ) / self.cell_size ).astype( int )
+        return np.clip( cell, 0, self.columns - 1 )
 
-                    #print( "      Trying other hole.  Check = {}".format( hole == other_hole ) )
 
-                    # If the other hole intersects, don't bother checking
-                    # remaining holes:
-                    if other_hole.intersects(
-                        bridge,
-                        check_connects = (
-                            other_hole == hole or other_hole == self
-                        )
-                    ): break
+    #------------------------------------------------------------------------
 
-                    #print( "        Hole does not intersect." )
+    # Indices of the boxes containing the given point (on their boundary
+    # included), in increasing order.
+    def around( self, point ):
 
-                else:
-                    print( "      Found insertion point: {}, {}".format( cp, hp ) )
+        if self.cell_start is None:
+            return []
 
-                    # No other holes intersected, so this insertion point
-                    # is acceptable:
-                    return ( cp, hole.points_starting_on_index( hp ) )
+        column, row = self._cell( np.array( [ [ point.x, point.y ] ] ) )[ 0 ]
+        cell = column * self.rows + row
+        boxes = self.cell_boxes[
+            self.cell_start[ cell ] : self.cell_start[ cell + 1 ]
+        ]
 
-        print(
-            "Could not insert segment without overlapping other segments"
+        found = self.boxes[ boxes ]
+        inside = (
+            ( found[ :, 0 ] <= point.x ) & ( point.x <= found[ :, 2 ] ) &
+            ( found[ :, 1 ] <= point.y ) & ( point.y <= found[ :, 3 ] )
         )
 
+        return boxes[ inside ].tolist()
+
 
     #------------------------------------------------------------------------
 
-    # Return the list of ordered points starting on the given index, ensuring
-    # that the first and last points are the same.
-    def points_starting_on_index( self, index ):
+#----------------------------------------------------------------------------
 
-        points = self.points
+class EdgeIndex( BoxIndex ):
 
-        if index > 0:
+    """ Grid of boxes over the edges of some polygon segments, so that a
+        line segment only needs to be checked against the edges lying in the
+        grid cells it covers, instead of against every edge. """
 
-            # Strip off end point, which is a duplicate of the start point:
-            points = points[ : -1 ]
+    __slots__ = ( 'starts', 'ends', 'owners' )
 
-            points = points[ index : ] + points[ : index ]
 
-            points.append(
-                svg.Point( points[ 0 ].x, points[ 0 ].y )
-            )
+    #------------------------------------------------------------------------
 
-        return points
+    def __init__( self, segments ):
+
+        coords = [ segment.points.coords for segment in segments ]
+
+        # Each edge joins two consecutive points of a segment:
+        self.starts = np.concatenate( [ c[ : -1 ] for c in coords ] )
+        self.ends = np.concatenate( [ c[ 1 : ] for c in coords ] )
+        self.owners = np.repeat(
+            np.arange( len( segments ) ),
+            [ max( 0, len( c ) - 1 ) for c in coords ]
+        )
+
+        p = self.starts.astype( float )
+        q = self.ends.astype( float )
+        super( EdgeIndex, self ).__init__(
+            np.hstack( ( np.minimum( p, q ), np.maximum( p, q ) ) )
+        )
 
 
     #------------------------------------------------------------------------
 
-    # Return a list of points with the given polygon segments (paths) inlined.
-    def inline( self, segments ):
+    # Candidate (bridge, edge) pairs for line segments given by their end
+    # point arrays p and q: the edges registered in the cells crossed by each
+    # line segment, all the line segments at once.
+    def candidates( self, p, q ):
 
-        if len( segments ) < 1:
-            return self.points
+        if self.cell_start is None:
+            return np.zeros( 0, dtype = int ), np.zeros( 0, dtype = int )
 
-        print( "    Inlining {} segments...".format( len( segments ) ) )
+        p = np.asarray( p, dtype = float )
+        q = np.asarray( q, dtype = float )
+        swap = p[ :, 0 ] > q[ :, 0 ]
+        p, q = np.where( swap[ :, None ], q, p ), np.where( swap[ :, None ], p, q )
+        px, py, qx, qy = p[ :, 0 ], p[ :, 1 ], q[ :, 0 ], q[ :, 1 ]
 
-        all_segments = segments[ : ] + [ self ]
-        insertions = []
+        # Abscissa range of each line segment within each column it crosses:
+        low, high = self._cell( p ), self._cell( q )
+        counts = high[ :, 0 ] - low[ :, 0 ] + 1
+        lines = np.repeat( np.arange( len( p ) ), counts )
+        columns = (
+            np.repeat( low[ :, 0 ], counts ) +
+            np.arange( counts.sum() ) -
+            np.repeat( np.cumsum( counts ) - counts, counts )
+        )
+        left = self.origin[ 0 ] + columns * self.cell_size[ 0 ]
+        x = np.column_stack( (
+            np.maximum( left, px[ lines ] ),
+            np.minimum( left + self.cell_size[ 0 ], qx[ lines ] ),
+        ) )
 
-        # Find the insertion point for each hole:
-        for hole in segments:
+        # Matching ordinate range, widened a little against rounding errors:
+        dx = qx - px
+        slope = ( qy - py ) / np.where( dx > 0, dx, 1 )
+        y = np.where(
+            ( dx > 0 )[ lines, None ],
+            py[ lines, None ] + ( x - px[ lines, None ] ) * slope[ lines, None ],
+            np.column_stack( ( py, qy ) )[ lines ]
+        )
+        margin = self.cell_size[ 1 ] * 1e-6
+        rows = np.column_stack( (
+            y.min( axis = 1 ) - margin, y.max( axis = 1 ) + margin,
+        ) )
+        rows = np.clip(
+            np.floor( ( rows - self.origin[ 1 ] ) / self.cell_size[ 1 ] ).astype( int ),
+            0, self.rows - 1
+        )
 
-            insertion = self._find_insertion_point(
-                hole, all_segments
+        # All the cells of each column, then all the edges of each cell:
+        counts = rows[ :, 1 ] - rows[ :, 0 ] + 1
+        lines = np.repeat( lines, counts )
+        cells = (
+            np.repeat( columns * self.rows + rows[ :, 0 ], counts ) +
+            np.arange( counts.sum() ) -
+            np.repeat( np.cumsum( counts ) - counts, counts )
+        )
+        starts = self.cell_start[ cells ]
+        counts = self.cell_start[ cells + 1 ] - starts
+        lines = np.repeat( lines, counts )
+        edges = self.cell_boxes[
+            np.repeat( starts - np.cumsum( counts ) + counts, counts ) +
+            np.arange( counts.sum() )
+        ]
+
+        # An edge spanning several cells is only tested once per line:
+        pairs = np.unique( lines * len( self.owners ) + edges )
+        return pairs // len( self.owners ), pairs % len( self.owners )
+
+
+    #------------------------------------------------------------------------
+
+    # Same as PolygonSegment.intersects() for all the indexed segments at
+    # once, for the line segments given by their end point arrays p and q:
+    # connections with the edges of the segments whose indices are in the
+    # connected collection are not considered as intersections.  Returns
+    # whether each line segment intersects any edge.
+    def intersects( self, p, q, connected = () ):
+
+        lines, edges = self.candidates( p, q )
+        starts, ends = self.starts[ edges ], self.ends[ edges ]
+
+        hits = LineSegment.intersections( p[ lines ], q[ lines ], starts, ends )
+        if len( connected ) > 0:
+            hits &= ~(
+                np.in1d( self.owners[ edges ], connected ) &
+                LineSegment.connections( p[ lines ], q[ lines ], starts, ends )
             )
-            if insertion is not None:
-                insertions.append( insertion )
 
-        insertions.sort( key = lambda i: i[ 0 ] )
+        return np.bincount( lines[ hits ], minlength = len( p ) ) > 0
 
-        inlined = [ self.points[ 0 ] ]
-        ip = 1
-        points = self.points
 
-        for insertion in insertions:
+    #------------------------------------------------------------------------
 
-            while ip <= insertion[ 0 ]:
-                inlined.append( points[ ip ] )
-                ip += 1
+#----------------------------------------------------------------------------
 
-            if (
-                inlined[ -1 ].x == insertion[ 1 ][ 0 ].x and
-                inlined[ -1 ].y == insertion[ 1 ][ 0 ].y
-            ):
-                inlined += insertion[ 1 ][ 1 : -1 ]
-            else:
-                inlined += insertion[ 1 ]
+class QuadIndex( object ):
 
-            inlined.append( svg.Point(
-                points[ ip - 1 ].x,
-                points[ ip - 1 ].y,
-            ) )
+    """ Quadtree over line segments, so that a line segment only needs to be
+        checked against the line segments passing through the same leaf
+        cells.  A cell where more than a few line segments end is split in
+        four, so that dense detail gets cells as small as it needs, however
+        small it is next to the whole drawing.  Line segments only passing
+        through a cell are not split apart by smaller cells, so they do not
+        split it. """
 
-        while ip < len( points ):
-            inlined.append( points[ ip ] )
-            ip += 1
+    __slots__ = ( 'starts', 'ends', 'leaf_start', 'leaf_segments' )
 
-        return inlined
+    # Most line segments ending in a leaf cell, and most levels of cells:
+    leaf_size = 16
+    depth = 24
 
 
     #------------------------------------------------------------------------
 
-    def intersects( self, line_segment, check_connects ):
+    # The line segments are given by their (N,2) arrays of end points.
+    def __init__( self, starts, ends ):
 
-        hole_segment = LineSegment()
+        self.starts = p = np.asarray( starts, dtype = float )
+        self.ends = q = np.asarray( ends, dtype = float )
 
-        # Check each segment of other hole for intersection:
-        for point in self.points:
+        self.leaf_segments = np.zeros( 0, dtype = int )
+        self.leaf_start = np.zeros( 1, dtype = int )
+        if len( p ) < 1:
+            return
 
-            hole_segment.q_next( point )
+        px, py, qx, qy = p[ :, 0 ], p[ :, 1 ], q[ :, 0 ], q[ :, 1 ]
+        low_x, low_y = np.minimum( px, qx ), np.minimum( py, qy )
+        high_x, high_y = np.maximum( px, qx ), np.maximum( py, qy )
 
-            if hole_segment.p is not None:
+        # The root cell is the square over all the line segments.  Cells are
+        # widened a little against rounding errors, the more so the farther
+        # they are from zero:
+        origin = np.array( [ low_x.min(), low_y.min() ] )
+        size = max( high_x.max() - origin[ 0 ], high_y.max() - origin[ 1 ] ) or 1.0
+        margin = size * 1e-9 + max(
+            np.abs( origin ).max(), abs( high_x.max() ), abs( high_y.max() )
+        ) * 1e-12
 
-                if (
-                    check_connects and
-                    line_segment.connects( hole_segment )
-                ): continue
+        # Entries (a line segment in a cell) sorted by cell, with the lower
+        # corner of each cell:
+        segment = np.arange( len( p ) )
+        group = np.zeros( len( p ), dtype = int )
+        corners = origin[ None, : ]
 
-                if line_segment.intersects( hole_segment ):
+        leaf_segments, leaf_counts = [], []
+        for level in range( self.depth + 1 ):
 
-                    #print( "Intersection detected." )
+            cell = size / 2.0 ** level
+            counts = np.bincount( group )
+            x0 = corners[ group, 0 ] - margin
+            y0 = corners[ group, 1 ] - margin
+            x1 = x0 + ( cell + 2 * margin )
+            y1 = y0 + ( cell + 2 * margin )
 
-                    return True
+            # Cells where few enough line segments end are leaves:
+            if level == self.depth:
+                split = np.zeros( len( counts ), dtype = bool )
+            else:
+                ax, ay = px[ segment ], py[ segment ]
+                bx, by = qx[ segment ], qy[ segment ]
+                ending = (
+                    ( ax >= x0 ) & ( ax <= x1 ) & ( ay >= y0 ) & ( ay <= y1 )
+                ) | (
+                    ( bx >= x0 ) & ( bx <= x1 ) & ( by >= y0 ) & ( by <= y1 )
+                )
+                split = np.bincount(
+                    group[ ending ], minlength = len( counts )
+                ) > self.leaf_size
+            entries = split[ group ]
+            leaf_segments.append( segment[ ~entries ] )
+            leaf_counts.append( counts[ ~split ] )
+
+            if not split.any():
+                break
+            segment, group = segment[ entries ], group[ entries ]
+            x0, y0 = x0[ entries ], y0[ entries ]
+
+            # The line segments of the cells split go to the quarters (0 to 3
+            # for lower left, upper left, lower right, upper right) their
+            # boxes overlap:
+            half = cell / 2
+            left = low_x[ segment ] <= x0 + ( half + 2 * margin )
+            right = high_x[ segment ] >= x0 + half
+            lower = low_y[ segment ] <= y0 + ( half + 2 * margin )
+            upper = high_y[ segment ] >= y0 + half
+            quarters = np.column_stack( (
+                left & lower, left & upper, right & lower, right & upper,
+            ) )
 
-        return False
+            # Unless they overlap all four, the line segments cross them:
+            across = np.flatnonzero( left & right & lower & upper )
+            corner = np.column_stack( ( x0[ across ], y0[ across ] ) ) + margin
+            for k in range( 4 ):
+                quarters[ across, k ] = self._passes(
+                    p[ segment[ across ] ], q[ segment[ across ] ],
+                    corner + [ k // 2 * half, k % 2 * half ],
+                    half, margin
+                )
+
+            # Entries of the quarters, sorted by quarter:
+            entry, quarter = np.nonzero( quarters )
+            key = group[ entry ] * 4 + quarter
+            order = np.argsort( key, kind = 'mergesort' )
+            key, segment = key[ order ], segment[ entry[ order ] ]
+
+            first = np.ones( len( key ), dtype = bool )
+            first[ 1 : ] = key[ 1 : ] != key[ : -1 ]
+            group = np.cumsum( first ) - 1
+            key = key[ first ]
+            corners = corners[ key // 4 ] + np.column_stack(
+                ( key % 4 // 2, key % 2 )
+            ) * half
+
+        self.leaf_segments = np.concatenate( leaf_segments )
+        self.leaf_start = np.append( 0, np.cumsum( np.concatenate( leaf_counts ) ) )
 
 
     #------------------------------------------------------------------------
 
-    # Apply all transformations and rounding, then remove duplicate
-    # consecutive points along the path.
-    def process( self, transformer, flip ):
+    # Whether each line segment pq passes through its square cell, given by
+    # its lower corner and its size, widened by the margin: a line segment
+    # touching a cell always passes through it.
+    @staticmethod
+    def _passes( p, q, corner, size, margin ):
 
-        points = []
-        for point in self.points:
+        x0, y0 = corner[ :, 0 ] - margin, corner[ :, 1 ] - margin
+        x1, y1 = x0 + size + 2 * margin, y0 + size + 2 * margin
 
-            point = transformer.transform_point( point, flip )
+        # The boxes overlap:
+        passes = (
+            ( np.minimum( p[ :, 0 ], q[ :, 0 ] ) <= x1 ) &
+            ( np.maximum( p[ :, 0 ], q[ :, 0 ] ) >= x0 ) &
+            ( np.minimum( p[ :, 1 ], q[ :, 1 ] ) <= y1 ) &
+            ( np.maximum( p[ :, 1 ], q[ :, 1 ] ) >= y0 )
+        )
 
-            if (
-                len( points ) < 1 or
-                point.x != points[ -1 ].x or
-                point.y != points[ -1 ].y
-            ):
-                points.append( point )
+        # And the corners of the cell are not all on one side of the line:
+        dx, dy = q[ :, 0 ] - p[ :, 0 ], q[ :, 1 ] - p[ :, 1 ]
+        sides = np.column_stack( [
+            dx * ( cy - p[ :, 1 ] ) - dy * ( cx - p[ :, 0 ] )
+            for cx, cy in ( ( x0, y0 ), ( x0, y1 ), ( x1, y0 ), ( x1, y1 ) )
+        ] )
 
-        if (
-            points[ 0 ].x != points[ -1 ].x or
-            points[ 0 ].y != points[ -1 ].y
-        ):
-            #print( "Warning: Closing polygon. start=({}, {}) end=({}, {})".format(
-                #points[ 0 ].x, points[ 0 ].y,
-                #points[ -1 ].x, points[ -1 ].y,
-            #) )
+        return passes & ~np.all( sides > 0, axis = 1 ) & ~np.all( sides < 0, axis = 1 )
 
-            points.append( svg.Point(
-                points[ 0 ].x,
-                points[ 0 ].y,
-            ) )
 
-        #else:
-            #print( "Polygon closed: start=({}, {}) end=({}, {})".format(
-                #points[ 0 ].x, points[ 0 ].y,
-                #points[ -1 ].x, points[ -1 ].y,
-            #) )
+    #------------------------------------------------------------------------
+
+    # All the pairs of line segments which may meet: passing through a same
+    # leaf cell, with overlapping boxes.  Returned as two arrays of indices
+    # i < j, sorted.
+    def pairs( self ):
+
+        # Each entry of a leaf with each entry after it in the same leaf:
+        counts = np.diff( self.leaf_start )
+        entry = np.arange( len( self.leaf_segments ) )
+        after = np.repeat( self.leaf_start[ 1 : ], counts ) - entry - 1
+        first = np.repeat( entry, after )
+        second = first + 1 + (
+            np.arange( after.sum() ) -
+            np.repeat( np.cumsum( after ) - after, after )
+        )
+        i = self.leaf_segments[ first ]
+        j = self.leaf_segments[ second ]
+
+        # Line segments sharing several leaves are paired once:
+        n = len( self.starts )
+        pair = np.unique( np.minimum( i, j ) * n + np.maximum( i, j ) )
+        i, j = pair // n, pair % n
 
-        self.points = points
+        p, q = self.starts, self.ends
+        low, high = np.minimum( p, q ), np.maximum( p, q )
+        overlap = np.all( ( low[ i ] <= high[ j ] ) & ( low[ j ] <= high[ i ] ), axis = 1 )
+
+        return i[ overlap ], j[ overlap ]
 
 
     #------------------------------------------------------------------------
 
 #----------------------------------------------------------------------------
 
-class Svg2ModImport( object ):
+class HoleEliminator( object ):
+
+    """ Polygon outline with holes merged in one at a time, each through a
+        bridge to a vertex visible from the hole.  The merged polygon is a
+        ring of nodes linked both ways, all allocated upfront so that a merge
+        only relinks a few nodes. """
+
+    __slots__ = ( 'coords', 'dtype', 'next', 'prev', 'used', 'reversed' )
+
 
     #------------------------------------------------------------------------
 
-    def __init__( self, file_name, module_name, module_value ):
+    def __init__( self, outline, holes ):
 
-        self.file_name = file_name
-        self.module_name = module_name
-        self.module_value = module_value
+        # The last point of each closed segment is a duplicate of the first:
+        size = len( outline.points ) - 1 + sum(
+            len( hole.points ) + 1 for hole in holes
+        )
 
-        print( "Parsing SVG..." )
-        self.svg = svg.parse( file_name )
+        self.coords = np.empty( ( size, 2 ) )
+        self.dtype = outline.points.coords.dtype
+        self.next = np.empty( size, dtype = int )
+        self.prev = np.empty( size, dtype = int )
+        self.used = 0
+
+        # The outline is walked one way and the holes the other way:
+        self.reversed = self._link( outline.points.coords[ : -1 ], True )
+        self.used = len( outline.points ) - 1
 
 
     #------------------------------------------------------------------------
 
-#----------------------------------------------------------------------------
+    # Write the ring of the given coordinates to the unused nodes, reversing
+    # it if needed to get the given orientation.  Return True if reversed.
+    def _link( self, ring, clockwise ):
+
+        x, y = ring[ :, 0 ], ring[ :, 1 ]
+        area = np.sum( ( np.roll( x, 1 ) - x ) * ( y + np.roll( y, 1 ) ) )
+
+        reverse = clockwise != ( area > 0 )
+        if reverse:
+            ring = ring[ : : -1 ]
+
+        start = self.used
+        nodes = np.arange( start, start + len( ring ) )
+
+        self.coords[ nodes ] = ring
+        self.next[ nodes ] = np.roll( nodes, -1 )
+        self.prev[ nodes ] = np.roll( nodes, 1 )
+
+        return reverse
 
-class Svg2ModExport( object ):
 
     #------------------------------------------------------------------------
 
     @staticmethod
-    def _convert_decimil_to_mm( decimil ):
-        return float( decimil ) * 0.00254
+    def _area( p, q, r ):
+
+        return ( q[ 1 ] - p[ 1 ] ) * ( r[ 0 ] - q[ 0 ] ) - \
+            ( q[ 0 ] - p[ 0 ] ) * ( r[ 1 ] - q[ 1 ] )
 
 
     #------------------------------------------------------------------------
 
-    @staticmethod
-    def _convert_mm_to_decimil( mm ):
-        return int( round( mm * 393.700787 ) )
+    # Whether a bridge from node a to node b starts inside the polygon.
+    def _locally_inside( self, a, b ):
+
+        coords = self.coords
+        area = self._area
+        a_prev = coords[ self.prev[ a ] ].tolist()
+        a_next = coords[ self.next[ a ] ].tolist()
+        a, b = coords[ a ].tolist(), coords[ b ].tolist()
+
+        if area( a_prev, a, a_next ) < 0:
+            return area( a, b, a_next ) >= 0 and area( a, a_prev, b ) >= 0
+
+        return area( a, b, a_prev ) < 0 or area( a, a_next, b ) < 0
 
 
     #------------------------------------------------------------------------
 
-    def _get_fill_stroke( self, item ):
+    # Find a node of the merged polygon visible from the given hole node,
+    # which must be the rightmost point of its hole: cast a ray to the right
+    # up to the nearest edge, then take the edge's right end point unless
+    # other nodes lie between the ray and that point, in which case the
+    # node closest in angle to the ray is taken.
+    def _find_bridge( self, hole, active ):
 
-        fill = True
-        stroke = True
-        stroke_width = 0.0
+        hx, hy = self.coords[ hole ].tolist()
+        px, py = self.coords[ : active, 0 ], self.coords[ : active, 1 ]
+        following = self.next[ : active ]
+        qy = py[ following ]
 
-        if item.style is not None and item.style != "":
+        same = np.flatnonzero( ( px == hx ) & ( py == hy ) )
+        if len( same ) > 0:
+            return same[ 0 ]
 
-            for property in item.style.split( ";" ):
+        # Edges crossed by the ray, of which the nearest:
+        edges = np.flatnonzero(
+            ( np.minimum( py, qy ) <= hy ) & ( hy <= np.maximum( py, qy ) ) &
+            ( py != qy )
+        )
+        p = self.coords[ edges ]
+        q = self.coords[ following[ edges ] ]
+        x = p[ :, 0 ] + ( hy - p[ :, 1 ] ) * ( q[ :, 0 ] - p[ :, 0 ] ) / \
+            ( q[ :, 1 ] - p[ :, 1 ] )
+        crossed = np.flatnonzero( x >= hx )
+        if len( crossed ) < 1:
+            return None
+
+        nearest = crossed[ np.argmin( x[ crossed ] ) ]
+        ix = x[ nearest ]
+        edge = edges[ nearest ]
+        bridge = edge if p[ nearest, 0 ] > q[ nearest, 0 ] else following[ edge ]
+        if ix == hx:
+            return bridge
+
+        # Nodes within the triangle of the hole point, the ray intersection
+        # and the bridge end point (on its boundary included):
+        mx, my = px[ bridge ], py[ bridge ]
+        candidates = np.flatnonzero(
+            ( px > hx ) & ( px <= mx ) &
+            ( py >= min( hy, my ) ) & ( py <= max( hy, my ) )
+        )
+        cx, cy = px[ candidates ], py[ candidates ]
 
-                nv = property.split( ":" );
-                name = nv[ 0 ].strip()
-                value = nv[ 1 ].strip()
+        def side( ax, ay, bx, by ):
+            return ( bx - ax ) * ( cy - ay ) - ( by - ay ) * ( cx - ax )
 
-                if name == "fill" and value == "none":
-                    fill = False
+        sides = np.column_stack( (
+            side( hx, hy, ix, hy ),
+            side( ix, hy, mx, my ),
+            side( mx, my, hx, hy ),
+        ) )
+        inside = ~( ( sides < 0 ).any( axis = 1 ) & ( sides > 0 ).any( axis = 1 ) )
+        candidates, cx, cy = candidates[ inside ], cx[ inside ], cy[ inside ]
 
-                elif name == "stroke" and value == "none":
-                    stroke = False
+        # The smallest angle with the ray first, then the closest:
+        tangent = np.abs( cy - hy ) / ( cx - hx )
+        order = np.lexsort( ( cx, tangent ) )
+        for node in candidates[ order ].tolist():
+            if self._locally_inside( node, hole ):
+                return node
 
-                elif name == "stroke-width":
-                    value = value.replace( "px", "" )
-                    stroke_width = float( value ) * 25.4 / float(self.dpi)
+        return bridge
 
-        if not stroke:
-            stroke_width = 0.0
-        elif stroke_width is None:
-            # Give a default stroke width?
-            stroke_width = self._convert_decimil_to_mm( 1 )
 
-        return fill, stroke, stroke_width
+    #------------------------------------------------------------------------
+
+    # Merge the given hole into the polygon.  Return False if the hole could
+    # not be bridged to the polygon (it lies outside).
+    def merge( self, hole ):
+
+        start = self.used
+        ring = hole.points.coords[ : -1 ]
+        self._link( ring, False )
+
+        # Rightmost point of the hole, the lowest one for a tie:
+        coords = self.coords[ start : start + len( ring ) ]
+        b = start + np.lexsort( ( coords[ :, 1 ], -coords[ :, 0 ] ) )[ 0 ]
+
+        a = self._find_bridge( b, start )
+        if a is None:
+            return False
+
+        self.used = start + len( ring )
+
+        # Walk the bridge there and back, with copies of both its ends:
+        a2, b2 = self.used, self.used + 1
+        self.used += 2
+        self.coords[ a2 ] = self.coords[ a ]
+        self.coords[ b2 ] = self.coords[ b ]
+
+        following, preceding = self.next, self.prev
+        an, bp = following[ a ], preceding[ b ]
+        following[ a ], preceding[ b ] = b, a
+        following[ a2 ], preceding[ an ] = an, a2
+        following[ b2 ], preceding[ a2 ] = a2, b2
+        following[ bp ], preceding[ b2 ] = b2, bp
+
+        return True
 
 
     #------------------------------------------------------------------------
 
-    def __init__(
-        self,
-        svg2mod_import,
-        file_name,
-        scale_factor = 1.0,
-        precision = 20.0,
-        use_mm = True,
-        dpi = DEFAULT_DPI,
-    ):
-        if use_mm:
-            # 25.4 mm/in;
-            scale_factor *= 25.4 / float(dpi)
-            use_mm = True
-        else:
-            # PCBNew uses "decimil" (10K DPI);
-            scale_factor *= 10000.0 / float(dpi)
+    # The points of the merged polygon, closed, in the outline's direction.
+    def points( self ):
+
+        following = self.next.tolist()
+        order = [ 0 ]
+        node = following[ 0 ]
+        while node != 0:
+            order.append( node )
+            node = following[ node ]
+
+        if self.reversed:
+            order[ 1 : ] = order[ : 0 : -1 ]
+        order.append( 0 )
+
+        return svg.PointArray(
+            self.coords[ order ], dtype = self.dtype
+        )
+
+
+    #------------------------------------------------------------------------
+
+#----------------------------------------------------------------------------
+
+class PolygonSegment( object ):
+
+    __slots__ = ( 'points', )
+
+    # Above this many candidate bridges, they are not sorted by length:
+    max_sorted_bridges = 4000000
+
+
+    #------------------------------------------------------------------------
+
+    def __init__( self, points ):
+
+        self.points = svg.PointArray( points )
+
+        if len( points ) < 3:
+            print(
+                "Warning:"
+                " Path segment has only {} points (not a polygon?)".format(
+                    len( points )
+                )
+            )
+
+
+    #------------------------------------------------------------------------
+
+    # KiCad will not "pick up the pen" when moving between a polygon outline
+    # and holes within it, so we search for a pair of points connecting the
+    # outline (self) to the hole such that the connecting segment will not
+    # cross the visible inner space within any hole.
+    def _find_insertion_point( self, hole, holes, index = None ):
+
+        #print( "      Finding insertion point.  {} holes".format( len( holes ) ) )
+
+        if index is None:
+            index = EdgeIndex( holes )
+
+        # Touching the edges of the hole or of the outline is allowed:
+        connected = [
+            i for i, other_hole in enumerate( holes )
+            if other_hole is hole or other_hole is self
+        ]
+
+        # Candidate (container point, hole point) pairs, the shortest bridges
+        # first, as they are the least likely to cross anything.  The old
+        # order (all hole points for each container point) is kept for huge
+        # paths, where sorting every pair would take too much memory.
+        container = self.points.coords.astype( float )
+        hole_points = hole.points.coords[ : -1 ].astype( float )
+        pairs = len( container ) * len( hole_points )
+
+        if pairs <= self.max_sorted_bridges:
+            lengths = (
+                ( container[ :, 0, None ] - hole_points[ None, :, 0 ] ) ** 2 +
+                ( container[ :, 1, None ] - hole_points[ None, :, 1 ] ) ** 2
+            )
+            order = np.argsort( lengths, axis = None, kind = 'mergesort' )
+        else:
+            order = np.arange( pairs )
+
+        # The bridges are checked by growing batches against the edges around
+        # them, and the first one in order which crosses no edge is taken:
+        start, size = 0, 16
+        while start < pairs:
+
+            cp, hp = divmod( order[ start : start + size ], len( hole_points ) )
+            hits = index.intersects(
+                self.points.coords[ cp ], hole.points.coords[ hp ], connected
+            )
+
+            free = np.flatnonzero( ~hits )
+            if len( free ) > 0:
+
+                cp, hp = int( cp[ free[ 0 ] ] ), int( hp[ free[ 0 ] ] )
+                print( "      Found insertion point: {}, {}".format( cp, hp ) )
+
+                # No edge intersected, so this insertion point is acceptable:
+                return ( cp, hole.points_starting_on_index( hp ) )
+
+            start += size
+            size = min( size * 2, 4096 )
+
+        print(
+            "Could not insert segment without overlapping other segments"
+        )
+
+
+    #------------------------------------------------------------------------
+
+    # Return the list of ordered points starting on the given index, ensuring
+    # that the first and last points are the same.
+    def points_starting_on_index( self, index ):
+
+        points = self.points
+
+        if index > 0:
+
+            # Strip off end point, which is a duplicate of the start point:
+            coords = points.coords[ : -1 ]
+
+            points = svg.PointArray( np.concatenate( (
+                coords[ index : ],
+                coords[ : index + 1 ],
+            ) ) )
+
+        return points
+
+
+    #------------------------------------------------------------------------
+
+    # Return a list of points with the given polygon segments (paths) inlined.
+    def inline( self, segments ):
+
+        if len( segments ) < 1:
+            return self.points
+
+        print( "    Inlining {} segments...".format( len( segments ) ) )
+
+        all_segments = segments[ : ] + [ self ]
+        insertions = []
+
+        # The edges of all the segments, indexed once for every hole:
+        index = EdgeIndex( all_segments )
+
+        # Find the insertion point for each hole:
+        for hole in segments:
+
+            insertion = self._find_insertion_point(
+                hole, all_segments, index
+            )
+            if insertion is not None:
+                insertions.append( insertion )
+
+        insertions.sort( key = lambda i: i[ 0 ] )
+
+        # Collect slices of the outline and holes, then join them once:
+        points = self.points.coords
+        inlined = [ points[ : 1 ] ]
+        ip = 1
+
+        for insertion in insertions:
+
+            if ip <= insertion[ 0 ]:
+                inlined.append( points[ ip : insertion[ 0 ] + 1 ] )
+                ip = insertion[ 0 ] + 1
+
+            # The last point written so far is always points[ ip - 1 ]:
+            hole = insertion[ 1 ].coords
+            if (
+                points[ ip - 1, 0 ] == hole[ 0, 0 ] and
+                points[ ip - 1, 1 ] == hole[ 0, 1 ]
+            ):
+                inlined.append( hole[ 1 : -1 ] )
+            else:
+                inlined.append( hole )
+
+            inlined.append( points[ ip - 1 : ip ] )
+
+        inlined.append( points[ ip : ] )
+
+        return svg.PointArray(
+            np.concatenate( inlined ), dtype = points.dtype
+        )
+
+
+    #------------------------------------------------------------------------
+
+    # Same as inline(), but by hole elimination: the holes are merged from
+    # right to left, each bridged from its rightmost point to the nearest
+    # visible point on its right, which belongs to the outline or to a hole
+    # merged before.  Bridges cannot cross, and the cost stays close to
+    # linear in the number of points for each hole.
+    def eliminate_holes( self, segments ):
+
+        if len( segments ) < 1:
+            return self.points
+
+        print( "    Eliminating {} holes...".format( len( segments ) ) )
+
+        polygon = HoleEliminator( self, segments )
+
+        holes = sorted(
+            segments, key = lambda hole: -hole.points.coords[ :, 0 ].max()
+        )
+        for hole in holes:
+
+            if not polygon.merge( hole ):
+                print(
+                    "Could not insert segment without overlapping other segments"
+                )
+
+        return polygon.points()
+
+
+    #------------------------------------------------------------------------
+
+    def intersects( self, line_segment, check_connects ):
+
+        coords = self.points.coords
+        if len( coords ) < 2:
+            return False
+
+        # Check each segment of other hole for intersection:
+        p = np.array( [ line_segment.p.x, line_segment.p.y ] )
+        q = np.array( [ line_segment.q.x, line_segment.q.y ] )
+        hits = LineSegment.intersections( p, q, coords[ : -1 ], coords[ 1 : ] )
+
+        if check_connects:
+            hits &= ~LineSegment.connections( p, q, coords[ : -1 ], coords[ 1 : ] )
+
+        return bool( hits.any() )
+
+
+    #------------------------------------------------------------------------
+
+    # Find where the edges of the given points (an inlined polygon) cross
+    # each other.  Edges only touching or overlapping, as bridges to holes
+    # do, are not crossing.  Return the pairs of edge indices and the
+    # crossing points, as arrays.
+    @staticmethod
+    def crossings( points ):
+
+        coords = points.coords.astype( float )
+        a, b = coords[ : -1 ], coords[ 1 : ]
+
+        # Only the edges passing through a same leaf of the quadtree may
+        # cross:
+        i, j = QuadIndex( a, b ).pairs()
+
+        def cross( u, v ):
+            return u[ :, 0 ] * v[ :, 1 ] - u[ :, 1 ] * v[ :, 0 ]
+
+        r, s = b[ i ] - a[ i ], b[ j ] - a[ j ]
+        d1, d2 = cross( r, a[ j ] - a[ i ] ), cross( r, b[ j ] - a[ i ] )
+        d3, d4 = cross( s, a[ i ] - a[ j ] ), cross( s, b[ i ] - a[ j ] )
+
+        crossing = (
+            ( np.sign( d1 ) * np.sign( d2 ) < 0 ) &
+            ( np.sign( d3 ) * np.sign( d4 ) < 0 )
+        )
+        t = d3[ crossing ] / ( d3[ crossing ] - d4[ crossing ] )
+
+        return (
+            np.column_stack( ( i[ crossing ], j[ crossing ] ) ),
+            a[ i[ crossing ] ] + r[ crossing ] * t[ :, None ],
+        )
+
+
+    #------------------------------------------------------------------------
+
+    # Signed area of the polygon segment (positive when counterclockwise,
+    # with the Y axis pointing up).
+    def area( self ):
+
+        coords = self.points.coords.astype( float )
+        x, y = coords[ :, 0 ], coords[ :, 1 ]
+
+        return 0.5 * (
+            np.dot( x[ : -1 ], y[ 1 : ] ) - np.dot( x[ 1 : ], y[ : -1 ] )
+        )
+
+
+    #------------------------------------------------------------------------
+
+    # Whether the given point lies inside the polygon segment: a ray cast
+    # from the point crosses its edges an odd number of times.
+    def contains( self, point ):
+
+        coords = self.points.coords.astype( float )
+        p, q = coords[ : -1 ], coords[ 1 : ]
+
+        crossed = ( p[ :, 1 ] > point.y ) != ( q[ :, 1 ] > point.y )
+        p, q = p[ crossed ], q[ crossed ]
+        x = p[ :, 0 ] + ( point.y - p[ :, 1 ] ) * ( q[ :, 0 ] - p[ :, 0 ] ) / \
+            ( q[ :, 1 ] - p[ :, 1 ] )
+
+        return np.count_nonzero( x > point.x ) % 2 == 1
+
+
+    #------------------------------------------------------------------------
+
+    # Sort the given polygon segments (the subpaths of a path) into outlines
+    # and holes, according to the SVG fill rule (nonzero or evenodd), and
+    # return a list of ( outline, holes ) pairs, each outline coming with
+    # its direct holes only.  Each segment is placed in the smallest segment
+    # containing it, so islands within holes get outlines of their own.
+    # Segments with the same fill on both sides are left out.
+    @staticmethod
+    def nest( segments, fill_rule = 'nonzero' ):
+
+        if len( segments ) < 2:
+            return [ ( segment, [] ) for segment in segments ]
+
+        areas = [ segment.area() for segment in segments ]
+        boxes = np.array( [
+            np.concatenate( (
+                segment.points.coords.min( axis = 0 ),
+                segment.points.coords.max( axis = 0 ),
+            ) )
+            for segment in segments
+        ], dtype = float )
+
+        index = BoxIndex( boxes )
+
+        # Larger segments first, so that containers come before contents:
+        order = sorted(
+            range( len( segments ) ), key = lambda i: -abs( areas[ i ] )
+        )
+        ranks = dict( ( i, rank ) for rank, i in enumerate( order ) )
+
+        parent = {}
+        inside = {}
+        outside = {}
+
+        for rank, i in enumerate( order ):
+
+            # Candidate containers are the larger segments whose boxes hold
+            # its box, of which the smallest actually containing it is the
+            # parent:
+            box = boxes[ i ]
+            point = segments[ i ].points[ 0 ]
+            candidates = sorted( (
+                j for j in index.around( point )
+                if ranks[ j ] < rank and
+                boxes[ j, 0 ] <= box[ 0 ] and boxes[ j, 1 ] <= box[ 1 ] and
+                boxes[ j, 2 ] >= box[ 2 ] and boxes[ j, 3 ] >= box[ 3 ]
+            ), key = lambda j: -ranks[ j ] )
+
+            parent[ i ] = None
+            for candidate in candidates:
+                if segments[ candidate ].contains( point ):
+                    parent[ i ] = candidate
+                    break
+
+            # Fill just outside and just inside the segment, as winding
+            # numbers for nonzero or as filled flags for evenodd:
+            if parent[ i ] is None:
+                outside[ i ] = 0
+            else:
+                outside[ i ] = inside[ parent[ i ] ]
+
+            if fill_rule == 'evenodd':
+                inside[ i ] = 1 - outside[ i ]
+            else:
+                inside[ i ] = outside[ i ] + ( 1 if areas[ i ] > 0 else -1 )
+
+        # Outlines have the fill inside and holes outside; each hole belongs
+        # to the outline around it:
+        outlines = [
+            i for i in range( len( segments ) )
+            if inside[ i ] != 0 and outside[ i ] == 0
+        ]
+        holes = dict( ( i, [] ) for i in outlines )
+
+        for i in range( len( segments ) ):
+
+            if inside[ i ] != 0 or outside[ i ] == 0:
+                continue
+
+            outline = parent[ i ]
+            while outline is not None and outline not in holes:
+                outline = parent[ outline ]
+
+            if outline is not None:
+                holes[ outline ].append( segments[ i ] )
+
+        return [ ( segments[ i ], holes[ i ] ) for i in outlines ]
+
+
+    #------------------------------------------------------------------------
+
+    # Apply rounding (the points are already transformed), then remove
+    # duplicate consecutive points along the path.
+    def process( self, transformer ):
+
+        # A few points are faster processed one by one:
+        if len( self.points ) < svg.PointArray.short:
+
+            # Same rounding as round_point():
+            if transformer.use_mm:
+                points = [
+                    ( round( x, 12 ), round( y, 12 ) )
+                    for x, y in self.points.coords.tolist()
+                ]
+            else:
+                points = [
+                    ( int( round( x ) ), int( round( y ) ) )
+                    for x, y in self.points.coords.tolist()
+                ]
+
+            # Repeated points are dropped, and the polygon is closed:
+            coords = points[ : 1 ]
+            for point in points[ 1 : ]:
+                if point != coords[ -1 ]:
+                    coords.append( point )
+
+            if coords[ 0 ] != coords[ -1 ]:
+                coords.append( coords[ 0 ] )
+
+            self.points = svg.PointArray( coords, dtype = None )
+            return
+
+        coords = transformer.round_coords( self.points.coords )
+
+        # Repeated points are dropped, and the polygon is closed:
+        keep = np.ones( len( coords ), dtype = bool )
+        keep[ 1 : ] = ( coords[ 1 : ] != coords[ : -1 ] ).any( axis = 1 )
+        coords = coords[ keep ]
+
+        if ( coords[ 0 ] != coords[ -1 ] ).any():
+            #print( "Warning: Closing polygon. start=({}, {}) end=({}, {})".format(
+                #coords[ 0, 0 ], coords[ 0, 1 ],
+                #coords[ -1, 0 ], coords[ -1, 1 ],
+            #) )
+
+            coords = np.concatenate( ( coords, coords[ : 1 ] ) )
+
+        # Decimil coordinates are rounded to integers and are kept that way:
+        self.points = svg.PointArray( coords, dtype = None )
+
+
+    #------------------------------------------------------------------------
+
+    # Visvalingam-Whyatt simplification of the (closed) polygon: the point
+    # making the smallest triangle with its neighbours is removed, as long
+    # as that area is below the given one and at least a triangle is left.
+    # This drops collinear points, zero area spikes and tiny notches left
+    # by rounding.  Returns the count of points removed.
+    def simplify( self, area ):
+
+        coords = self.points.coords[ : -1 ]
+        count = len( coords )
+        if count <= 3:
+            return 0
+
+        x = coords[ :, 0 ].astype( float ).tolist()
+        y = coords[ :, 1 ].astype( float ).tolist()
+        previous = [ count - 1 ] + list( range( count - 1 ) )
+        following = list( range( 1, count ) ) + [ 0 ]
+
+        def triangle( i ):
+            p, n = previous[ i ], following[ i ]
+            return abs(
+                ( x[ i ] - x[ p ] ) * ( y[ n ] - y[ p ] ) -
+                ( x[ n ] - x[ p ] ) * ( y[ i ] - y[ p ] )
+            ) / 2.0
+
+        # Only the points below the area are queued.  Entries are left in
+        # the heap when the area of their point changes, and skipped:
+        areas = [ triangle( i ) for i in range( count ) ]
+        heap = [ ( a, i ) for i, a in enumerate( areas ) if a < area ]
+        heapq.heapify( heap )
+
+        removed = np.zeros( count, dtype = bool )
+        left = count
+        while len( heap ) > 0 and left > 3:
+
+            a, i = heapq.heappop( heap )
+            if removed[ i ] or a != areas[ i ]:
+                continue
+
+            removed[ i ] = True
+            left -= 1
+
+            p, n = previous[ i ], following[ i ]
+            following[ p ], previous[ n ] = n, p
+
+            for j in ( p, n ):
+                areas[ j ] = triangle( j )
+                if areas[ j ] < area:
+                    heapq.heappush( heap, ( areas[ j ], j ) )
+
+        coords = coords[ ~removed ]
+        self.points = svg.PointArray(
+            np.concatenate( ( coords, coords[ : 1 ] ) ), dtype = None
+        )
+
+        return count - left
+
+
+    #------------------------------------------------------------------------
+
+#----------------------------------------------------------------------------
+
+class PolygonUnion( object ):
+
+    """ Union of filled polygons (outlines with their holes), computed on an
+        integer grid: all the edges are split where they meet, the pieces
+        with the fill on one side only are kept and joined back into rings,
+        which are then nested into outlines and holes. """
+
+    __slots__ = ( 'scale', 'integer', 'edges', 'owners' )
+
+
+    #------------------------------------------------------------------------
+
+    # The polygons are ( outline, holes ) pairs of polygon segments, whose
+    # coordinates are multiplied by the given scale and rounded to integers.
+    def __init__( self, polygons, scale = 1 ):
+
+        self.scale = scale
+        self.integer = scale == 1 and all(
+            outline.points.coords.dtype.kind == 'i'
+            for outline, holes in polygons
+        )
+
+        # Edges of the rings of each polygon, without the null ones:
+        starts, ends, owners = [], [], []
+        for owner, ( outline, holes ) in enumerate( polygons ):
+
+            for segment in [ outline ] + holes:
+
+                ring = np.round(
+                    segment.points.coords[ : -1 ] * scale
+                ).astype( np.int64 )
+                ring = ring[
+                    np.any( ring != np.roll( ring, 1, axis = 0 ), axis = 1 )
+                ]
+                if len( ring ) < 3:
+                    continue
+
+                starts.append( ring )
+                ends.append( np.roll( ring, -1, axis = 0 ) )
+                owners.append( np.full( len( ring ), owner, dtype = int ) )
+
+        if len( starts ) < 1:
+            self.edges = np.zeros( ( 0, 4 ), dtype = np.int64 )
+            self.owners = np.zeros( 0, dtype = int )
+            return
+
+        self.edges = np.hstack( (
+            np.concatenate( starts ), np.concatenate( ends )
+        ) )
+        self.owners = np.concatenate( owners )
+
+
+    #------------------------------------------------------------------------
+
+    @staticmethod
+    def _cross( u, v ):
+
+        return u[ :, 0 ] * v[ :, 1 ] - u[ :, 1 ] * v[ :, 0 ]
+
+
+    #------------------------------------------------------------------------
+
+    # Split the edges at all the points where they cross or touch other
+    # edges, rounded to the grid, then replace them with the pieces, which
+    # still form the rings of each polygon.  Return the pieces, each once
+    # whatever the edges it belongs to, as an (N,4) array of start and end
+    # coordinates.
+    def _split( self ):
+
+        a, b = self.edges[ :, : 2 ], self.edges[ :, 2 : ]
+        cross = self._cross
+
+        # Only the edges passing through a same leaf of the quadtree may
+        # meet:
+        i, j = QuadIndex( a, b ).pairs()
+
+        ai, bi, aj, bj = a[ i ], b[ i ], a[ j ], b[ j ]
+        r, s = bi - ai, bj - aj
+        d1, d2 = cross( r, aj - ai ), cross( r, bj - ai )
+        d3, d4 = cross( s, ai - aj ), cross( s, bi - aj )
+
+        cut_edges = [ np.arange( len( a ) ), np.arange( len( a ) ) ]
+        cut_points = [ a, b ]
+
+        # Crossings, rounded to the grid:
+        crossing = (
+            ( np.sign( d1 ) * np.sign( d2 ) < 0 ) &
+            ( np.sign( d3 ) * np.sign( d4 ) < 0 )
+        )
+        t = d3[ crossing ] / ( d3[ crossing ] - d4[ crossing ] ).astype( float )
+        point = np.round(
+            ai[ crossing ] + r[ crossing ] * t[ :, None ]
+        ).astype( np.int64 )
+        cut_edges += [ i[ crossing ], j[ crossing ] ]
+        cut_points += [ point, point ]
+
+        # End points lying on the other edge, which also covers overlaps:
+        for side, edge, point, start, direction in (
+            ( d1, i, aj, ai, r ),
+            ( d2, i, bj, ai, r ),
+            ( d3, j, ai, aj, s ),
+            ( d4, j, bi, aj, s ),
+        ):
+            along = np.sum( ( point - start ) * direction, axis = 1 )
+            on = ( side == 0 ) & ( along > 0 ) & (
+                along < np.sum( direction * direction, axis = 1 )
+            )
+            cut_edges.append( edge[ on ] )
+            cut_points.append( point[ on ] )
+
+        cut_edges = np.concatenate( cut_edges )
+        cut_points = np.concatenate( cut_points )
+
+        # Sort the cuts of each edge along it, and drop the repeated ones:
+        direction = ( b - a )[ cut_edges ]
+        key = np.where(
+            np.abs( direction[ :, 0 ] ) >= np.abs( direction[ :, 1 ] ),
+            cut_points[ :, 0 ] * np.sign( direction[ :, 0 ] ),
+            cut_points[ :, 1 ] * np.sign( direction[ :, 1 ] ),
+        )
+        order = np.lexsort( ( key, cut_edges ) )
+        cut_edges, cut_points = cut_edges[ order ], cut_points[ order ]
+
+        repeated = np.zeros( len( cut_edges ), dtype = bool )
+        repeated[ 1 : ] = ( cut_edges[ 1 : ] == cut_edges[ : -1 ] ) & np.all(
+            cut_points[ 1 : ] == cut_points[ : -1 ], axis = 1
+        )
+        cut_edges, cut_points = cut_edges[ ~repeated ], cut_points[ ~repeated ]
+
+        # Pieces between consecutive cuts, then in a canonical direction so
+        # that shared pieces can be found:
+        same = cut_edges[ 1 : ] == cut_edges[ : -1 ]
+        p, q = cut_points[ : -1 ][ same ], cut_points[ 1 : ][ same ]
+        self.edges = np.hstack( ( p, q ) )
+        self.owners = self.owners[ cut_edges[ : -1 ][ same ] ]
+
+        swap = ( p[ :, 0 ] > q[ :, 0 ] ) | (
+            ( p[ :, 0 ] == q[ :, 0 ] ) & ( p[ :, 1 ] > q[ :, 1 ] )
+        )
+        pieces = np.where( swap[ :, None ], np.hstack( ( q, p ) ), np.hstack( ( p, q ) ) )
+
+        order = np.lexsort( pieces.T[ : : -1 ] )
+        pieces = pieces[ order ]
+        repeated = np.zeros( len( pieces ), dtype = bool )
+        repeated[ 1 : ] = np.all( pieces[ 1 : ] == pieces[ : -1 ], axis = 1 )
+
+        return pieces[ ~repeated ]
+
+
+    #------------------------------------------------------------------------
+
+    # Whether each of the given points lies inside the region bounded by the
+    # given edges, by the parity of the edges crossed by a ray cast to the
+    # right.  The edges are sorted into horizontal bands, so that each point
+    # is only checked against the edges of its band.
+    @staticmethod
+    def _inside( edges, points ):
+
+        inside = np.zeros( len( points ), dtype = bool )
+        ax, ay, bx, by = edges.T
+
+        low, high = np.minimum( ay, by ), np.maximum( ay, by )
+        bands = int( math.sqrt( len( edges ) ) ) + 1
+        origin = low.min()
+        height = ( high.max() - origin ) / float( bands ) or 1.0
+
+        def band( y ):
+            return np.clip(
+                np.floor( ( y - origin ) / height ).astype( int ), 0, bands - 1
+            )
+
+        # Register each edge in all the bands it covers:
+        first, last = band( low ), band( high )
+        counts = last - first + 1
+        edge = np.repeat( np.arange( len( edges ) ), counts )
+        registered = first[ edge ] + (
+            np.arange( len( edge ) ) - np.repeat( np.cumsum( counts ) - counts, counts )
+        )
+        order = np.argsort( registered, kind = 'mergesort' )
+        band_edges = edge[ order ]
+        band_start = np.searchsorted( registered[ order ], np.arange( bands + 1 ) )
+
+        point_band = band( points[ :, 1 ] )
+        for number in np.unique( point_band ).tolist():
+
+            found = np.flatnonzero( point_band == number )
+            e = band_edges[ band_start[ number ] : band_start[ number + 1 ] ]
+            if len( e ) < 1:
+                continue
+
+            # A limited number of points against the edges at once:
+            step = max( 1, 1000000 // len( e ) )
+            for chunk in range( 0, len( found ), step ):
+
+                k = found[ chunk : chunk + step ]
+                x, y = points[ k, 0, None ], points[ k, 1, None ]
+
+                with np.errstate( divide = 'ignore', invalid = 'ignore' ):
+                    crossed = ( ( ay[ e ] > y ) != ( by[ e ] > y ) ) & (
+                        ax[ e ] + ( y - ay[ e ] ) * ( bx[ e ] - ax[ e ] ) /
+                        ( by[ e ] - ay[ e ] ) > x
+                    )
+
+                inside[ k ] = np.count_nonzero( crossed, axis = 1 ) % 2 == 1
+
+        return inside
+
+
+    #------------------------------------------------------------------------
+
+    # Whether each of the given points lies inside any of the polygons.
+    def _covered( self, points ):
+
+        covered = np.zeros( len( points ), dtype = bool )
+        edges = self.edges.astype( float )
+
+        order = np.argsort( self.owners, kind = 'mergesort' )
+        bounds = np.searchsorted(
+            self.owners[ order ], np.arange( self.owners.max() + 2 )
+        )
+
+        # Points by abscissa, so that those around a polygon are a slice:
+        by_x = np.argsort( points[ :, 0 ], kind = 'mergesort' )
+        x = points[ by_x, 0 ]
+
+        for owner in range( len( bounds ) - 1 ):
+
+            polygon = edges[ order[ bounds[ owner ] : bounds[ owner + 1 ] ] ]
+            if len( polygon ) < 1:
+                continue
+
+            low = np.minimum( polygon[ :, : 2 ], polygon[ :, 2 : ] ).min( axis = 0 )
+            high = np.maximum( polygon[ :, : 2 ], polygon[ :, 2 : ] ).max( axis = 0 )
+
+            candidates = by_x[
+                np.searchsorted( x, low[ 0 ] ) :
+                np.searchsorted( x, high[ 0 ], side = 'right' )
+            ]
+            y = points[ candidates, 1 ]
+            candidates = candidates[
+                ( y >= low[ 1 ] ) & ( y <= high[ 1 ] ) & ~covered[ candidates ]
+            ]
+
+            if len( candidates ) > 0:
+                covered[ candidates ] = self._inside(
+                    polygon, points[ candidates ]
+                )
+
+        return covered
+
+
+    #------------------------------------------------------------------------
+
+    # Join the given boundary pieces, directed with the fill on their left,
+    # into rings.  Where several pieces leave a point, the one turning the
+    # most to the left is followed, so that touching rings stay apart.
+    @staticmethod
+    def _join( pieces ):
+
+        starts = [ tuple( p ) for p in pieces[ :, : 2 ].tolist() ]
+        ends = [ tuple( p ) for p in pieces[ :, 2 : ].tolist() ]
+
+        leaving = {}
+        for number, start in enumerate( starts ):
+            leaving.setdefault( start, [] ).append( number )
+
+        used = [ False ] * len( pieces )
+        rings = []
+
+        for first in range( len( pieces ) ):
+
+            if used[ first ]:
+                continue
+
+            ring = []
+            piece = first
+            while piece is not None and not used[ piece ]:
+
+                used[ piece ] = True
+                ring.append( starts[ piece ] )
+
+                # Clockwise angle from the way back to each way out:
+                ( sx, sy ), ( ex, ey ) = starts[ piece ], ends[ piece ]
+                rx, ry = sx - ex, sy - ey
+                best = None
+                for other in leaving.get( ends[ piece ], [] ):
+
+                    ox = ends[ other ][ 0 ] - ex
+                    oy = ends[ other ][ 1 ] - ey
+                    angle = -math.atan2( rx * oy - ry * ox, rx * ox + ry * oy )
+                    if angle <= 0:
+                        angle += 2 * math.pi
+
+                    if best is None or angle < best[ 0 ]:
+                        best = ( angle, other )
+
+                piece = best[ 1 ] if best is not None else None
+
+            if len( ring ) > 2:
+                rings.append( np.array( ring, dtype = np.int64 ) )
+
+        return rings
+
+
+    #------------------------------------------------------------------------
+
+    # Points of the given ring without those in the middle of straight runs.
+    @staticmethod
+    def _simplify( ring ):
+
+        before = ring - np.roll( ring, 1, axis = 0 )
+        after = np.roll( ring, -1, axis = 0 ) - ring
+        straight = ( PolygonUnion._cross( before, after ) == 0 ) & (
+            np.sum( before * after, axis = 1 ) > 0
+        )
+
+        return ring[ ~straight ]
+
+
+    #------------------------------------------------------------------------
+
+    # Return the union as a list of ( outline, holes ) pairs.
+    def polygons( self ):
+
+        if len( self.edges ) < 1:
+            return []
+
+        pieces = self._split()
+
+        # Test points on both sides of the middle of each piece:
+        p = pieces[ :, : 2 ].astype( float )
+        q = pieces[ :, 2 : ].astype( float )
+        middle = ( p + q ) / 2.0
+        normal = np.column_stack( ( p[ :, 1 ] - q[ :, 1 ], q[ :, 0 ] - p[ :, 0 ] ) )
+        normal *= 1e-3 / np.hypot( normal[ :, 0 ], normal[ :, 1 ] )[ :, None ]
+
+        left, right = self._covered(
+            np.concatenate( ( middle + normal, middle - normal ) )
+        ).reshape( 2, -1 )
+
+        # The boundary pieces, with the fill on their left:
+        boundary = left != right
+        pieces = np.where(
+            left[ :, None ], pieces, pieces[ :, [ 2, 3, 0, 1 ] ]
+        )[ boundary ]
+
+        segments = []
+        for ring in self._join( pieces ):
+
+            ring = self._simplify( ring )
+            if len( ring ) < 3:
+                continue
+
+            ring = np.concatenate( ( ring, ring[ : 1 ] ) )
+            if self.integer:
+                segment = PolygonSegment( ring )
+                segment.points = svg.PointArray( ring, dtype = int )
+            else:
+                segment = PolygonSegment( ring / float( self.scale ) )
+            segments.append( segment )
+
+        return PolygonSegment.nest( segments )
+
+
+    #------------------------------------------------------------------------
+
+#----------------------------------------------------------------------------
+
+class Svg2ModImport( object ):
+
+    #------------------------------------------------------------------------
+
+    def __init__(
+        self,
+        file_name,
+        module_name,
+        module_value,
+        stream = False,
+        layers = None,
+    ):
+
+        self.file_name = file_name
+        self.module_name = module_name
+        self.module_value = module_value
+
+        # The names of the only layers parsed, if not all of them:
+        self.layers = layers
+
+        print( "Parsing SVG..." )
+
+        # Transformations are left to the exporter, which fuses them with its
+        # own translation and scaling:
+        self.svg = svg.parse( file_name, stream, layers, transform = False )
+
+
+    #------------------------------------------------------------------------
+
+#----------------------------------------------------------------------------
+
+class Svg2ModExport( object ):
+
+    # The worker processes only pay off with enough points to convert, and
+    # enough points per path to outweigh sending each path to a worker:
+    parallel_points = 20000
+    parallel_path_points = 50
+
+
+    #------------------------------------------------------------------------
+
+    @staticmethod
+    def _convert_decimil_to_mm( decimil ):
+        return float( decimil ) * 0.00254
+
+
+    #------------------------------------------------------------------------
+
+    @staticmethod
+    def _convert_mm_to_decimil( mm ):
+        return int( round( mm * 393.700787 ) )
+
+
+    #------------------------------------------------------------------------
+
+    def _get_fill_stroke( self, item ):
+
+        fill = True
+        stroke = True
+        stroke_width = 0.0
+        fill_rule = 'nonzero'
+
+        if item.style is not None and item.style != "":
+
+            for property in item.style.split( ";" ):
+
+                nv = property.split( ":" );
+                name = nv[ 0 ].strip()
+                value = nv[ 1 ].strip()
+
+                if name == "fill" and value == "none":
+                    fill = False
+
+                elif name == "fill-rule":
+                    fill_rule = value
+
+                elif name == "stroke" and value == "none":
+                    stroke = False
+
+                elif name == "stroke-width":
+                    value = value.replace( "px", "" )
+                    stroke_width = float( value ) * 25.4 / float(self.dpi)
+
+        if not stroke:
+            stroke_width = 0.0
+        elif stroke_width is None:
+            # Give a default stroke width?
+            stroke_width = self._convert_decimil_to_mm( 1 )
+
+        return fill, stroke, stroke_width, fill_rule
+
+
+    #------------------------------------------------------------------------
+
+    def __init__(
+        self,
+        svg2mod_import,
+        file_name,
+        scale_factor = 1.0,
+        precision = 20.0,
+        use_mm = True,
+        dpi = DEFAULT_DPI,
+        tolerance = None,
+        holes = 'bridge',
+        compose = False,
+        union = False,
+        validate = None,
+        jobs = 1,
+        timestamp = None,
+        simplify = None,
+    ):
+        if use_mm:
+            # 25.4 mm/in;
+            scale_factor *= 25.4 / float(dpi)
+            use_mm = True
+        else:
+            # PCBNew uses "decimil" (10K DPI);
+            scale_factor *= 10000.0 / float(dpi)
+
+        # The curve tolerance is given in mm of the final output, where
+        # curves get flattened:
+        if tolerance is not None and not use_mm:
+            tolerance *= 10000.0 / 25.4
+
+        # So is the simplification area, in mm^2:
+        if simplify is not None and not use_mm:
+            simplify *= ( 10000.0 / 25.4 ) ** 2
+
+        self.imported = svg2mod_import
+        self.file_name = file_name
+        self.scale_factor = scale_factor
+        self.precision = precision
+        self.tolerance = tolerance
+        self.simplify = simplify
+        self.holes = holes
+        self.compose = compose
+        self.union = union
+        self.validate = validate
+        self.crossings = 0
+        self.jobs = jobs
+        self.timestamp = timestamp
+        self.processes = 1
+        self.pool = None
+        self.use_mm = use_mm
+        self.dpi = dpi
+
+    #------------------------------------------------------------------------
+
+    def _calculate_translation( self ):
+
+        min_point, max_point = self.imported.svg.bbox( self.imported.svg.matrix )
+
+        # Center the drawing:
+        adjust_x = min_point.x + ( max_point.x - min_point.x ) / 2.0
+        adjust_y = min_point.y + ( max_point.y - min_point.y ) / 2.0
+
+        self.translation = svg.Point(
+            0.0 - adjust_x,
+            0.0 - adjust_y,
+        )
+
+
+    #------------------------------------------------------------------------
+
+    # Find and keep only the layers of interest.  The transformations of
+    # the groups containing a layer are folded into the layer's own matrix.
+    # The layers which were not parsed are empty groups, left out.
+    def _prune( self, items = None, matrix = None ):
+
+        if items is None:
+
+            self.layers = {}
+            for name in self.layer_map.iterkeys():
+                if self.imported.layers is None or name in self.imported.layers:
+                    self.layers[ name ] = None
+
+            items = self.imported.svg.items
+            matrix = self.imported.svg.matrix
+            self.imported.svg.items = []
+            self.imported.svg.bbox_cache = None
+
+        for item in items:
+
+            if not isinstance( item, svg.Group ):
+                continue
+
+            for name in self.layers.iterkeys():
+                #if re.search( name, item.name, re.I ):
+                if name == item.name:
+                    print( "Found SVG layer: {}".format( item.name ) )
+                    item.matrix = matrix * item.matrix
+                    self.imported.svg.items.append( item )
+                    self.layers[ name ] = item
+                    break
+            else:
+                self._prune( item.items, matrix * item.matrix )
+
+
+    #------------------------------------------------------------------------
+
+    # Flatten, round and nest the subpaths of an SVG item, transformed by
+    # the given matrix.  Returns None for unsupported items, or the polygons
+    # of the item with its fill, stroke and stroke width.  The polygons to
+    # compose or unite are ( outline, holes ) pairs, the others are already
+    # inlined into their points.
+    def _convert_item( self, item, matrix ):
+
+        if not isinstance( item, svg.Path ):
+            return None
+
+        # Curves are flattened in output units:
+        segments = [
+            PolygonSegment( segment )
+            for segment in item.segments(
+                precision = self.precision * self.scale_factor,
+                tolerance = self.tolerance,
+                matrix = matrix,
+            )
+        ]
+
+        removed = 0
+        for segment in segments:
+            segment.process( self )
+            if self.simplify is not None:
+                removed += segment.simplify( self.simplify )
+
+        fill, stroke, stroke_width, fill_rule = self._get_fill_stroke( item )
+
+        if not self.use_mm:
+            stroke_width = self._convert_mm_to_decimil( stroke_width )
+
+        # Without a fill, there are no holes, only outlines:
+        if fill:
+            polygons = PolygonSegment.nest( segments, fill_rule )
+        else:
+            polygons = [ ( segment, [] ) for segment in segments ]
+
+        if not ( fill and ( self.compose or self.union ) ):
+            polygons = [
+                self._inline( outline, holes ) for outline, holes in polygons
+            ]
+
+        return polygons, fill, stroke, stroke_width, removed
+
+
+    #------------------------------------------------------------------------
+
+    # Convert the items of a layer into the points of its polygons, each
+    # with its fill, stroke and stroke width.
+    def _convert_layer( self, name, group ):
+
+        converted = []
+        filled = []
+        removed = 0
+
+        # Each path is transformed by its accumulated SVG transformations
+        # and by the output translation and scale, all at once:
+        items = list( group.iterflatten( self._output_matrix() ) )
+
+        # Items are converted one by one, or by the worker processes, and
+        # kept in document order either way:
+        if self.pool is None or not self._parallel(
+            item for item, matrix in items
+        ):
+            results = (
+                self._convert_item( item, matrix ) for item, matrix in items
+            )
+        else:
+            results = self.pool.imap(
+                _convert_item, items, chunksize = len( items ) // 256 + 1
+            )
+
+        for ( item, matrix ), result in itertools.izip( items, results ):
+
+            if result is None:
+                print( "Unsupported SVG element: {}".format(
+                    item.__class__.__name__
+                ) )
+                continue
+
+            polygons, fill, stroke, stroke_width, simplified = result
+            removed += simplified
+
+            # Filled paths are composed or united once all found:
+            if fill and ( self.compose or self.union ):
+                style = ( fill, stroke, stroke_width )
+                filled.extend(
+                    ( outline, holes, style ) for outline, holes in polygons
+                )
+                continue
+
+            for points in polygons:
+                converted.append( self._convert_points(
+                    points, fill, stroke, stroke_width
+                ) )
+
+        if self.simplify is not None:
+            print( "  Simplification removed {} points from layer {}".format(
+                removed, name
+            ) )
+
+        if len( filled ) > 0:
+
+            if self.compose:
+                filled = self._compose( filled )
+
+            if self.union:
+                filled = self._unite( filled )
+
+            for outline, holes, style in filled:
+                converted.append( self._convert_points(
+                    self._inline( outline, holes ), *style
+                ) )
+
+        return converted
+
+
+    #------------------------------------------------------------------------
+
+    # Convert all the layers once, for the front and back modules, with
+    # whole layers spread over the worker processes if there are enough to
+    # keep them busy.  Otherwise, the workers share the items of each layer.
+    def _convert_layers( self ):
+
+        layers = [
+            ( name, group )
+            for name, group in self.layers.iteritems()
+            if group is not None
+        ]
+
+        if self.pool is not None and len( layers ) >= self.processes:
+
+            results = self.pool.map( _convert_layer, layers, 1 )
+
+            # The workers also return their count of edge crossings:
+            self.crossings += sum( crossings for polygons, crossings in results )
+            results = [ polygons for polygons, crossings in results ]
+
+        else:
+
+            results = [
+                self._convert_layer( name, group ) for name, group in layers
+            ]
+
+        self.polygons = [
+            ( name, polygons )
+            for ( name, group ), polygons in zip( layers, results )
+        ]
+
+
+    #------------------------------------------------------------------------
+
+    # Whether the given items are worth converting in the worker processes:
+    # sending a path to a worker costs about as much as converting a few
+    # dozen points, and starting the workers as converting many paths.
+    def _parallel( self, items ):
+
+        paths = [ item for item in items if isinstance( item, svg.Path ) ]
+        points = sum( len( path.points ) for path in paths )
+
+        return (
+            len( paths ) > 1 and
+            points >= self.parallel_points and
+            points >= self.parallel_path_points * len( paths )
+        )
 
-        self.imported = svg2mod_import
-        self.file_name = file_name
-        self.scale_factor = scale_factor
-        self.precision = precision
-        self.use_mm = use_mm
-        self.dpi = dpi
 
     #------------------------------------------------------------------------
 
-    def _calculate_translation( self ):
+    # Nest the outlines and holes of all the given ( outline, holes, style )
+    # polygons of a layer with each other, so that filled paths drawn within
+    # others cut holes into them.  Each outline keeps the style of its path.
+    def _compose( self, polygons ):
 
-        min_point, max_point = self.imported.svg.bbox()
+        segments = []
+        styles = {}
+        for outline, holes, style in polygons:
+            for segment in [ outline ] + holes:
+                segments.append( segment )
+                styles[ id( segment ) ] = style
 
-        # Center the drawing:
-        adjust_x = min_point.x + ( max_point.x - min_point.x ) / 2.0
-        adjust_y = min_point.y + ( max_point.y - min_point.y ) / 2.0
+        print( "    Composing {} segments...".format( len( segments ) ) )
 
-        self.translation = svg.Point(
-            0.0 - adjust_x,
-            0.0 - adjust_y,
-        )
+        return [
+            ( outline, holes, styles[ id( outline ) ] )
+            for outline, holes in PolygonSegment.nest( segments, 'evenodd' )
+        ]
 
 
     #------------------------------------------------------------------------
 
-    # Find and keep only the layers of interest.
-    def _prune( self, items = None ):
+    # Merge the overlapping ( outline, holes, style ) polygons of a layer
+    # with the same style into as few polygons as possible.
+    def _unite( self, polygons ):
 
-        if items is None:
+        styles = []
+        for outline, holes, style in polygons:
+            if style not in styles:
+                styles.append( style )
 
-            self.layers = {}
-            for name in self.layer_map.iterkeys():
-                self.layers[ name ] = None
+        # Nanometers are the finest unit of KiCad:
+        scale = 1000000 if self.use_mm else 1
 
-            items = self.imported.svg.items
-            self.imported.svg.items = []
+        united = []
+        for style in styles:
 
-        for item in items:
+            group = [
+                ( outline, holes )
+                for outline, holes, other in polygons if other == style
+            ]
 
-            if not isinstance( item, svg.Group ):
-                continue
+            before = sum(
+                len( outline.points ) + sum( len( h.points ) for h in holes )
+                for outline, holes in group
+            )
 
-            for name in self.layers.iterkeys():
-                #if re.search( name, item.name, re.I ):
-                if name == item.name:
-                    print( "Found SVG layer: {}".format( item.name ) )
-                    self.imported.svg.items.append( item )
-                    self.layers[ name ] = item
-                    break
-            else:
-                self._prune( item.items )
+            result = PolygonUnion( group, scale ).polygons()
+
+            after = sum(
+                len( outline.points ) + sum( len( h.points ) for h in holes )
+                for outline, holes in result
+            )
+
+            print(
+                "    Union of {} polygons with {} points:"
+                " {} polygons with {} points".format(
+                    len( group ), before, len( result ), after
+                )
+            )
+
+            united.extend(
+                ( outline, holes, style ) for outline, holes in result
+            )
+
+        return united
 
 
     #------------------------------------------------------------------------
 
-    def _write_items( self, items, layer, flip = False ):
+    # Join the holes of a polygon to its outline, into a single list of
+    # points.
+    def _inline( self, outline, holes ):
 
-        for item in items:
+        if len( holes ) > 0 and self.holes == 'eliminate':
+            return outline.eliminate_holes( holes )
 
-            if isinstance( item, svg.Group ):
-                self._write_items( item.items, layer, flip )
-                continue
+        elif len( holes ) > 0:
+            return outline.inline( holes )
 
-            elif isinstance( item, svg.Path ):
+        return outline.points
 
-                segments = [
-                    PolygonSegment( segment )
-                    for segment in item.segments(
-                        precision = self.precision
-                    )
-                ]
 
-                for segment in segments:
-                    segment.process( self, flip )
+    #------------------------------------------------------------------------
 
-                if len( segments ) > 1:
-                    points = segments[ 0 ].inline( segments[ 1 : ] )
+    def _convert_points( self, points, fill, stroke, stroke_width ):
 
-                elif len( segments ) > 0:
-                    points = segments[ 0 ].points
+        print( "    Writing polygon with {} points".format(
+            len( points ) )
+        )
 
-                fill, stroke, stroke_width = self._get_fill_stroke( item )
+        # Without a fill, the points are written as open lines, which may
+        # cross each other:
+        if fill and self.validate is not None:
+            self._validate_polygon( points )
 
-                if not self.use_mm:
-                    stroke_width = self._convert_mm_to_decimil(
-                        stroke_width
-                    )
+        return points, fill, stroke, stroke_width
 
-                print( "    Writing polygon with {} points".format(
-                    len( points ) )
-                )
 
-                self._write_polygon(
-                    points, layer, fill, stroke, stroke_width
-                )
+    #------------------------------------------------------------------------
 
-            else:
-                print( "Unsupported SVG element: {}".format(
-                    item.__class__.__name__
-                ) )
+    # Report where the edges of the given polygon cross each other, which
+    # KiCad does not render properly.
+    def _validate_polygon( self, points ):
+
+        edges, crossings = PolygonSegment.crossings( points )
+        if len( edges ) < 1:
+            return
+
+        self.crossings += len( edges )
+
+        print( "Warning: Polygon edges cross each other at {} points:".format(
+            len( edges )
+        ) )
+        for ( i, j ), ( x, y ) in zip( edges.tolist()[ : 10 ], crossings.tolist() ):
+            print( "      Edges {} and {} at ({}, {})".format( i, j, x, y ) )
+        if len( edges ) > 10:
+            print( "      ..." )
 
 
     #------------------------------------------------------------------------
@@ -630,7 +2310,7 @@ class Svg2ModExport( object ):
 
         module_name = self._get_module_name( front )
 
-        min_point, max_point = self.imported.svg.bbox()
+        min_point, max_point = self.imported.svg.bbox( self.imported.svg.matrix )
         min_point = self.transform_point( min_point, flip = False )
         max_point = self.transform_point( max_point, flip = False )
 
@@ -653,26 +2333,43 @@ class Svg2ModExport( object ):
             front,
         )
 
-        for name, group in self.layers.iteritems():
-
-            if group is None: continue
+        for name, polygons in self.polygons:
 
             layer = self._get_layer_name( name, front )
 
             #print( "  Writing layer: {}".format( name ) )
-            self._write_items( group.items, layer, not front )
+            for points, fill, stroke, stroke_width in polygons:
+
+                if not front:
+                    points = self._mirror( points )
+
+                self._write_polygon(
+                    points, layer, fill, stroke, stroke_width
+                )
 
         self._write_module_footer( front )
 
 
+    #------------------------------------------------------------------------
+
+    # The back module is the front one mirrored around the y axis, with the
+    # points reversed so that the polygons keep the same winding.
+    @staticmethod
+    def _mirror( points ):
+
+        coords = points.coords[ : : -1 ].copy()
+        coords[ :, 0 ] = 0 - coords[ :, 0 ]
+
+        return svg.PointArray( coords, dtype = None )
+
+
     #------------------------------------------------------------------------
 
     def _write_polygon_filled( self, points, layer, stroke_width = 0.0 ):
 
         self._write_polygon_header( points, layer )
 
-        for point in points:
-            self._write_polygon_point( point )
+        self._write_polygon_points( points )
 
         self._write_polygon_footer( layer, stroke_width )
 
@@ -693,6 +2390,68 @@ class Svg2ModExport( object ):
             prior_point = point
 
 
+    #------------------------------------------------------------------------
+
+    # The translation and scale of transform_point() as a matrix.
+    def _output_matrix( self ):
+
+        return svg.Matrix( [
+            self.scale_factor, 0, 0, self.scale_factor,
+            self.translation.x * self.scale_factor,
+            self.translation.y * self.scale_factor,
+        ] )
+
+
+    #------------------------------------------------------------------------
+
+    def round_point( self, point ):
+
+        if self.use_mm:
+            return svg.Point(
+                round( point.x, 12 ),
+                round( point.y, 12 ),
+            )
+
+        rounded_point = svg.Point()
+        rounded_point.x = int( round( point.x ) )
+        rounded_point.y = int( round( point.y ) )
+        return rounded_point
+
+
+    #------------------------------------------------------------------------
+
+    # Same as round_point() for an array of coordinates: halfway cases are
+    # rounded away from zero, like Python does.
+    def round_coords( self, coords ):
+
+        if not self.use_mm:
+            whole = np.trunc( coords )
+            whole += np.where(
+                np.abs( coords - whole ) >= 0.5, np.sign( coords ), 0
+            )
+            return whole.astype( int )
+
+        scaled = coords * 1e12
+        whole = np.trunc( scaled )
+        fraction = np.abs( scaled - whole )
+        rounded = np.copysign(
+            ( whole + np.where( fraction >= 0.5, np.sign( scaled ), 0 ) ) / 1e12,
+            coords
+        )
+
+        # The scaled coordinates are off by up to half a unit in the last
+        # place, which only matters too close to halfway cases, or too far
+        # from zero for exact integers.  Python rounds those:
+        unsure = ~(
+            ( np.abs( fraction - 0.5 ) > np.abs( scaled ) * 2e-16 ) &
+            ( np.abs( scaled ) < 2.0 ** 52 )
+        )
+        for i, j in zip( *np.nonzero( unsure ) ):
+            rounded[ i, j ] = round( coords[ i, j ], 12 )
+
+        return rounded
+
+
     #------------------------------------------------------------------------
 
     def transform_point( self, point, flip = False ):
@@ -705,14 +2464,7 @@ class Svg2ModExport( object ):
         if flip:
             transformed_point.x *= -1
 
-        if self.use_mm:
-            transformed_point.x = round( transformed_point.x, 12 )
-            transformed_point.y = round( transformed_point.y, 12 )
-        else:
-            transformed_point.x = int( round( transformed_point.x ) )
-            transformed_point.y = int( round( transformed_point.y ) )
-
-        return transformed_point
+        return self.round_point( transformed_point )
 
 
     #------------------------------------------------------------------------
@@ -724,16 +2476,105 @@ class Svg2ModExport( object ):
         # Must come after pruning:
         translation = self._calculate_translation()
 
-        print( "Writing module file: {}".format( self.file_name ) )
-        self.output_file = open( self.file_name, 'w' )
+        # There is no point in more processes than CPUs:
+        self.processes = min(
+            self.jobs or multiprocessing.cpu_count(),
+            multiprocessing.cpu_count()
+        )
+
+        items = [
+            item
+            for group in self.layers.itervalues() if group is not None
+            for item, matrix in group.iterflatten()
+        ]
+
+        # Worker processes get a copy of the exporter settings, without the
+        # drawing:
+        if self.processes > 1 and self._parallel( items ):
+            worker = copy.copy( self )
+            worker.imported = worker.layers = None
+            self.pool = multiprocessing.Pool(
+                self.processes, _init_worker, ( worker, )
+            )
+
+        # The polygons are computed once for all the modules:
+        try:
+            self._convert_layers()
+
+        finally:
+            if self.pool is not None:
+                self.pool.terminate()
+                self.pool.join()
+                self.pool = None
+
+        self._open_output( self.file_name )
 
         self._write_library_intro()
 
         self._write_modules()
 
+        self._close_output()
+
+
+    #------------------------------------------------------------------------
+
+    # Module files are built in memory, and only replace the existing file
+    # if their content changed.  They are written to a temporary file first
+    # and renamed, so that a crash never leaves a truncated file behind.
+    def _open_output( self, file_name ):
+
+        print( "Writing module file: {}".format( file_name ) )
+        self.output_name = file_name
+        self.output_file = StringIO()
+
+
+    #------------------------------------------------------------------------
+
+    def _close_output( self ):
+
+        content = self.output_file.getvalue()
         self.output_file.close()
         self.output_file = None
 
+        # The files are compared and written as bytes:
+        if not isinstance( content, bytes ):
+            content = content.encode( 'utf-8' )
+
+        if os.path.isfile( self.output_name ):
+
+            with open( self.output_name, 'rb' ) as existing:
+                if existing.read() == content:
+                    print( "Module file unchanged: {}".format(
+                        self.output_name
+                    ) )
+                    return
+
+        directory, name = os.path.split( os.path.abspath( self.output_name ) )
+        handle, temp_name = tempfile.mkstemp( prefix = name + ".", dir = directory )
+
+        try:
+            with os.fdopen( handle, 'wb' ) as temp_file:
+                temp_file.write( content )
+
+            # Temporary files are only readable by their owner:
+            if os.path.isfile( self.output_name ):
+                mode = os.stat( self.output_name ).st_mode & 0o777
+            else:
+                umask = os.umask( 0 )
+                os.umask( umask )
+                mode = 0o666 & ~umask
+            os.chmod( temp_name, mode )
+
+            # Windows cannot rename over an existing file:
+            if os.name == 'nt' and os.path.isfile( self.output_name ):
+                os.remove( self.output_name )
+            os.rename( temp_name, self.output_name )
+
+        except:
+            if os.path.isfile( temp_name ):
+                os.remove( temp_name )
+            raise
+
 
     #------------------------------------------------------------------------
 
@@ -767,6 +2608,14 @@ class Svg2ModExportLegacy( Svg2ModExport ):
         use_mm = True,
         dpi = DEFAULT_DPI,
         include_reverse = True,
+        tolerance = None,
+        holes = 'bridge',
+        compose = False,
+        union = False,
+        validate = None,
+        jobs = 1,
+        timestamp = None,
+        simplify = None,
     ):
         super( Svg2ModExportLegacy, self ).__init__(
             svg2mod_import,
@@ -775,6 +2624,14 @@ class Svg2ModExportLegacy( Svg2ModExport ):
             precision,
             use_mm,
             dpi,
+            tolerance,
+            holes,
+            compose,
+            union,
+            validate,
+            jobs,
+            timestamp,
+            simplify,
         )
 
         self.include_reverse = include_reverse
@@ -792,6 +2649,18 @@ class Svg2ModExportLegacy( Svg2ModExport ):
         return layer
 
 
+    #------------------------------------------------------------------------
+
+    # Time stamp of the library, the current time unless a fixed one was
+    # given for reproducible output.
+    def _get_time( self ):
+
+        if self.timestamp is None:
+            return datetime.datetime.now()
+
+        return datetime.datetime.utcfromtimestamp( self.timestamp )
+
+
     #------------------------------------------------------------------------
 
     def _get_module_name( self, front = None ):
@@ -825,7 +2694,7 @@ $EndINDEX
 # {3}
 #
 """.format(
-    datetime.datetime.now().strftime( "%a %d %b %Y %I:%M:%S %p %Z" ),
+    self._get_time().strftime( "%a %d %b %Y %I:%M:%S %p %Z" ),
     units,
     modules_list,
     self.imported.file_name,
@@ -922,11 +2791,11 @@ T1 0 {5} {2} {2} 0 {3} N I 21 "{4}"
 
     #------------------------------------------------------------------------
 
-    def _write_polygon_point( self, point ):
+    def _write_polygon_points( self, points ):
 
-            self.output_file.write(
-                "Dl {} {}\n".format( point.x, point.y )
-            )
+        self.output_file.write( "".join(
+            "Dl {} {}\n".format( x, y ) for x, y in points.coords.tolist()
+        ) )
 
 
     #------------------------------------------------------------------------
@@ -957,6 +2826,14 @@ class Svg2ModExportLegacyUpdater( Svg2ModExportLegacy ):
         precision = 20.0,
         dpi = DEFAULT_DPI,
         include_reverse = True,
+        tolerance = None,
+        holes = 'bridge',
+        compose = False,
+        union = False,
+        validate = None,
+        jobs = 1,
+        timestamp = None,
+        simplify = None,
     ):
         self.file_name = file_name
         use_mm = self._parse_output_file()
@@ -969,6 +2846,14 @@ class Svg2ModExportLegacyUpdater( Svg2ModExportLegacy ):
             use_mm,
             dpi,
             include_reverse,
+            tolerance,
+            holes,
+            compose,
+            union,
+            validate,
+            jobs,
+            timestamp,
+            simplify,
         )
 
 
@@ -1187,6 +3072,49 @@ class Svg2ModExportPretty( Svg2ModExport ):
     }
 
 
+    #------------------------------------------------------------------------
+
+    def __init__(
+        self,
+        svg2mod_import,
+        file_name,
+        scale_factor = 1.0,
+        precision = 20.0,
+        dpi = DEFAULT_DPI,
+        include_reverse = False,
+        tolerance = None,
+        holes = 'bridge',
+        compose = False,
+        union = False,
+        validate = None,
+        jobs = 1,
+        timestamp = None,
+        simplify = None,
+        decimals = None,
+        points_per_line = 1,
+    ):
+        super( Svg2ModExportPretty, self ).__init__(
+            svg2mod_import,
+            file_name,
+            scale_factor,
+            precision,
+            True,
+            dpi,
+            tolerance,
+            holes,
+            compose,
+            union,
+            validate,
+            jobs,
+            timestamp,
+            simplify,
+        )
+
+        self.include_reverse = include_reverse
+        self.decimals = decimals
+        self.points_per_line = points_per_line
+
+
     #------------------------------------------------------------------------
 
     def _get_layer_name( self, name, front ):
@@ -1197,28 +3125,42 @@ class Svg2ModExportPretty( Svg2ModExport ):
             return self.layer_map[ name ].format("B")
 
 
+    #------------------------------------------------------------------------
+
+    # Edit time stamp of the module, the creation time of the SVG file
+    # unless a fixed one was given for reproducible output.
+    def _get_edit_time( self ):
+
+        if self.timestamp is None:
+            return int( round( os.path.getctime( self.imported.file_name ) ) )
+
+        return self.timestamp
+
+
     #------------------------------------------------------------------------
 
     def _get_module_name( self, front = None ):
 
+        if front is False:
+            return self.imported.module_name + "-rev"
+
         return self.imported.module_name
 
 
     #------------------------------------------------------------------------
 
-    def _write_library_intro( self ):
+    def _write_library_intro( self, front = True ):
 
-        self.output_file.write( """(module {0} (layer F.Cu) (tedit {1:8X})
+        self.output_file.write( """(module {0} (layer {4}.Cu) (tedit {1:8X})
   (attr smd)
   (descr "{2}")
   (tags {3})
 """.format(
-    self.imported.module_name, #0
-    int( round( os.path.getctime( #1
-        self.imported.file_name
-    ) ) ),
+    self._get_module_name( front ), #0
+    self._get_edit_time(), #1
     "Imported from {}".format( self.imported.file_name ), #2
     "svg2mod", #3
+    "F" if front else "B", #4
 )
         )
 
@@ -1245,6 +3187,8 @@ class Svg2ModExportPretty( Svg2ModExport ):
         else:
             side = "B"
 
+        reference_y, value_y = self._format_numbers( [ reference_y, value_y ] )
+
         self.output_file.write(
 """  (fp_text reference {0} (at 0 {1}) (layer {2}.SilkS) hide
     (effects (font (size {3} {3}) (thickness {4})))
@@ -1253,7 +3197,7 @@ class Svg2ModExportPretty( Svg2ModExport ):
     (effects (font (size {3} {3}) (thickness {4})))
   )""".format(
 
-    self._get_module_name(), #0
+    self._get_module_name( front ), #0
     reference_y, #1
     side, #2
     label_size, #3
@@ -1270,6 +3214,18 @@ class Svg2ModExportPretty( Svg2ModExport ):
 
         self._write_module( front = True )
 
+        # A pretty file holds a single module, so the back one gets its own:
+        if self.include_reverse:
+
+            self._close_output()
+
+            base, extension = os.path.splitext( self.file_name )
+            self._open_output( base + "-rev" + extension )
+
+            self._write_library_intro( front = False )
+
+            self._write_module( front = False )
+
 
     #------------------------------------------------------------------------
 
@@ -1295,7 +3251,7 @@ class Svg2ModExportPretty( Svg2ModExport ):
 
         self.output_file.write(
             "    )\n    (layer {})\n    (width {})\n  )".format(
-                layer, stroke_width
+                layer, self._format_numbers( [ stroke_width ] )[ 0 ]
             )
         )
 
@@ -1309,17 +3265,49 @@ class Svg2ModExportPretty( Svg2ModExport ):
 
     #------------------------------------------------------------------------
 
-    def _write_polygon_point( self, point ):
+    # Text of the given numbers, with the output number of decimals and no
+    # trailing zeros, or as Python prints them by default.
+    def _format_numbers( self, numbers ):
+
+        if self.decimals is None:
+            return [ "{}".format( number ) for number in numbers ]
+
+        text = "%.{}f".format( self.decimals )
+        numbers = [ text % number for number in numbers ]
+
+        if self.decimals > 0:
+            numbers = [
+                number.rstrip( "0" ).rstrip( "." ) for number in numbers
+            ]
+
+        return [ "0" if number == "-0" else number for number in numbers ]
 
-            self.output_file.write(
-                "      (xy {} {})\n".format( point.x, point.y )
-            )
+
+    #------------------------------------------------------------------------
+
+    def _write_polygon_points( self, points ):
+
+        numbers = self._format_numbers( points.coords.ravel().tolist() )
+        xy = [
+            "(xy {} {})".format( x, y )
+            for x, y in zip( numbers[ 0 : : 2 ], numbers[ 1 : : 2 ] )
+        ]
+
+        step = self.points_per_line
+        self.output_file.write( "".join(
+            "      {}\n".format( " ".join( xy[ i : i + step ] ) )
+            for i in range( 0, len( xy ), step )
+        ) )
 
 
     #------------------------------------------------------------------------
 
     def _write_polygon_segment( self, p, q, layer, stroke_width ):
 
+        px, py, qx, qy, width = self._format_numbers(
+            [ p.x, p.y, q.x, q.y, stroke_width ]
+        )
+
         self.output_file.write(
             """\n  (fp_line
     (start {} {})
@@ -1327,10 +3315,10 @@ class Svg2ModExportPretty( Svg2ModExport ):
     (layer {})
     (width {})
   )""".format(
-    p.x, p.y,
-    q.x, q.y,
+    px, py,
+    qx, qy,
     layer,
-    stroke_width,
+    width,
 )
         )
 
@@ -1339,6 +3327,33 @@ class Svg2ModExportPretty( Svg2ModExport ):
 
 #----------------------------------------------------------------------------
 
+# Exporter of the worker processes of a --jobs pool, see _init_worker(), as
+# bound methods cannot be sent to the workers with Python 2.  The workers
+# convert either single items or whole layers.
+_worker_exporter = None
+
+def _init_worker( exporter ):
+
+    global _worker_exporter
+    _worker_exporter = exporter
+
+
+def _convert_item( task ):
+
+    item, matrix = task
+    return _worker_exporter._convert_item( item, matrix )
+
+
+def _convert_layer( task ):
+
+    name, group = task
+    _worker_exporter.crossings = 0
+    polygons = _worker_exporter._convert_layer( name, group )
+    return polygons, _worker_exporter.crossings
+
+
+#----------------------------------------------------------------------------
+
 def get_arguments():
 
     parser = argparse.ArgumentParser(
@@ -1402,6 +3417,116 @@ def get_arguments():
         default = 10.0,
     )
 
+    parser.add_argument(
+        '-t', '--tolerance',
+        type = float,
+        dest = 'tolerance',
+        metavar = 'TOLERANCE',
+        help = (
+            "approximate curves adaptively, with at most this deviation" +
+            " in mm (float, overrides --precision)"
+        ),
+        default = None,
+    )
+
+    parser.add_argument(
+        '--simplify',
+        type = float,
+        dest = 'simplify',
+        metavar = 'AREA',
+        help = (
+            "remove the points making a triangle smaller than this area in" +
+            " mm^2 with their neighbours, once rounded (float)"
+        ),
+        default = None,
+    )
+
+    parser.add_argument(
+        '--holes',
+        type = str,
+        dest = 'holes',
+        metavar = 'METHOD',
+        choices = [ 'bridge', 'eliminate' ],
+        help = "method for joining holes to their outline (bridge|eliminate)",
+        default = 'bridge',
+    )
+
+    parser.add_argument(
+        '--compose',
+        dest = 'compose',
+        action = 'store_const',
+        const = True,
+        help = (
+            "cut filled paths drawn within other filled paths of a layer" +
+            " out of them"
+        ),
+        default = False,
+    )
+
+    parser.add_argument(
+        '--union',
+        dest = 'union',
+        action = 'store_const',
+        const = True,
+        help = "merge overlapping filled paths of a layer into single polygons",
+        default = False,
+    )
+
+    parser.add_argument(
+        '--validate',
+        type = str,
+        dest = 'validate',
+        metavar = 'ACTION',
+        choices = [ 'warn', 'fail' ],
+        help = "check that polygon edges do not cross each other (warn|fail)",
+    )
+
+    parser.add_argument(
+        '-j', '--jobs',
+        type = int,
+        dest = 'jobs',
+        metavar = 'JOBS',
+        help = (
+            "number of processes converting large drawings in parallel" +
+            " (int, 0 for one per CPU)"
+        ),
+        default = 1,
+    )
+
+    parser.add_argument(
+        '--timestamp',
+        type = int,
+        dest = 'timestamp',
+        metavar = 'SECONDS',
+        help = (
+            "fixed time stamp of the module file, in seconds since the" +
+            " epoch, for reproducible output (int, default:" +
+            " $SOURCE_DATE_EPOCH)"
+        ),
+        # An empty variable is the same as an unset one:
+        default = os.environ.get( 'SOURCE_DATE_EPOCH' ) or None,
+    )
+
+    parser.add_argument(
+        '--layers',
+        type = str,
+        dest = 'layers',
+        metavar = 'LAYERS',
+        help = "comma separated names of the layers to export (default: all)",
+    )
+
+    parser.add_argument(
+        '--stream',
+        dest = 'stream',
+        action = 'store_const',
+        const = True,
+        help = (
+            "read the SVG file incrementally, without keeping its XML" +
+            " tree in memory"
+        ),
+        default = False,
+    )
+
     parser.add_argument(
         '--front-only',
         dest = 'front_only',
@@ -1411,6 +3536,41 @@ def get_arguments():
         default = False,
     )
 
+    parser.add_argument(
+        '--reverse',
+        dest = 'reverse',
+        action = 'store_const',
+        const = True,
+        help = (
+            "also write the back module, to a -rev file (pretty output" +
+            " format)"
+        ),
+        default = False,
+    )
+
+    parser.add_argument(
+        '--decimals',
+        type = int,
+        dest = 'decimals',
+        metavar = 'DECIMALS',
+        help = (
+            "number of decimals of the coordinates, e.g. 6 for 1 nm (int," +
+            " pretty output format)"
+        ),
+    )
+
+    parser.add_argument(
+        '--points-per-line',
+        type = int,
+        dest = 'points_per_line',
+        metavar = 'POINTS',
+        help = (
+            "number of polygon points written on each line (int, pretty" +
+            " output format)"
+        ),
+        default = 1,
+    )
+
     parser.add_argument(
         '--format',
         type = str,
@@ -1447,7 +3607,8 @@ def get_arguments():
 
 #----------------------------------------------------------------------------
 
-main()
+if __name__ == "__main__":
+    main()
 
 
 #----------------------------------------------------------------------------
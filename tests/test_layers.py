@@ -0,0 +1,54 @@
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from svg2mod.svg2mod import Svg2ModImport, Svg2ModExportPretty
+
+
+SVG = '''<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+     width="400" height="400">
+  <g inkscape:label="Cu">
+    <path style="fill:#000000" d="M0,0 h10 v10 h-10 Z"/>
+  </g>
+  <g inkscape:label="SilkS">
+    <path style="fill:#000000" d="M200,200 h20 v20 h-20 Z"/>
+  </g>
+  <g inkscape:label="Edge.Cuts"><g/></g>
+</svg>
+'''
+
+
+class TestLayers(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def bbox(self, layers):
+        file_name = os.path.join(self.directory, 'test.svg')
+        with open(file_name, 'w') as f:
+            f.write(SVG)
+
+        imported = Svg2ModImport(file_name, 'test', 'G***', layers=layers)
+        exported = Svg2ModExportPretty(
+            imported, os.path.join(self.directory, 'test.kicad_mod'))
+        exported._prune()
+        min_point, max_point = imported.svg.bbox(imported.svg.matrix)
+        return min_point.coord(), max_point.coord()
+
+    def test_only_given_layers_are_kept(self):
+        # The Cu layer and the empty Edge.Cuts one take no room:
+        self.assertEqual(self.bbox(set(['SilkS'])), ((200, 200), (220, 220)))
+
+    def test_empty_layers_take_no_room(self):
+        self.assertEqual(self.bbox(None), ((0, 0), (220, 220)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import svg2mod.svg as svg
+
+
+SVG = '''<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+     width="200" height="200">
+  <title>Test</title>
+  <g inkscape:label="SilkS" transform="translate(10,0)">
+    <path id="a" d="M0,0 L10,10 L10,0 Z"/>
+    <g><path id="b" d="M20,0 h10 v10 h-10 Z"/></g>
+    <circle id="c" cx="50" cy="50" r="5"/>
+  </g>
+  <path id="d" d="M0,100 L10,110"/>
+</svg>
+'''
+
+
+class TestStream(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.file_name = os.path.join(self.directory, 'test.svg')
+        with open(self.file_name, 'w') as f:
+            f.write(SVG)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_same_items(self):
+        parsed = svg.parse(self.file_name)
+        streamed = svg.parse(self.file_name, stream=True)
+        self.assertEqual(
+            [(x.id, matrix.vect) for x, matrix in streamed.iterflatten()],
+            [(x.id, matrix.vect) for x, matrix in parsed.iterflatten()])
+        self.assertEqual(
+            [x.bbox(matrix) for x, matrix in streamed.iterflatten()],
+            [x.bbox(matrix) for x, matrix in parsed.iterflatten()])
+
+    def test_elements_are_released(self):
+        streamed = svg.parse(self.file_name, stream=True)
+        # Only the top level <title> is kept
+        self.assertEqual(
+            [elt.tag for elt in streamed.root], [svg.svg_ns + 'title'])
+        self.assertEqual(streamed.title().text, 'Test')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+from __future__ import absolute_import
+
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+
+import svg2mod.svg as svg
+from svg2mod.svg2mod import PolygonSegment, Svg2ModImport, Svg2ModExportPretty
+
+
+SVG = '''<svg xmlns="http://www.w3.org/2000/svg"
+     xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+     width="200" height="200">
+  <g inkscape:label="SilkS">
+    <path style="{}" d="{}"/>
+  </g>
+</svg>
+'''
+
+
+class TestValidate(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def crossings(self, style, d):
+        file_name = os.path.join(self.directory, 'test.svg')
+        with open(file_name, 'w') as f:
+            f.write(SVG.format(style, d))
+
+        imported = Svg2ModImport(file_name, 'test', 'G***')
+        exported = Svg2ModExportPretty(
+            imported,
+            os.path.join(self.directory, 'test.kicad_mod'),
+            1.0,
+            10.0,
+            96,
+            validate='fail',
+        )
+        exported.write()
+        return exported.crossings
+
+    def test_open_stroke_is_not_validated(self):
+        # Once closed, its last edge would cross its second one:
+        d = 'M0,120 L50,130 L100,120 l10 10 H130 V140'
+        self.assertEqual(
+            self.crossings('fill:none;stroke:#000000;stroke-width:1', d), 0)
+
+    def test_filled_polygon_is_validated(self):
+        d = 'M0,0 L10,10 L10,0 L0,10 Z'
+        self.assertEqual(self.crossings('fill:#000000', d), 1)
+
+
+class TestCrossings(unittest.TestCase):
+
+    def brute_force(self, coords):
+        a, b = coords[:-1], coords[1:]
+
+        def cross(u, v):
+            return u[0] * v[1] - u[1] * v[0]
+
+        pairs = []
+        for i in range(len(a)):
+            for j in range(i + 1, len(a)):
+                r, s = b[i] - a[i], b[j] - a[j]
+                if (np.sign(cross(r, a[j] - a[i])) *
+                        np.sign(cross(r, b[j] - a[i])) < 0 and
+                        np.sign(cross(s, a[i] - a[j])) *
+                        np.sign(cross(s, b[i] - a[j])) < 0):
+                    pairs.append([i, j])
+        return pairs
+
+    def test_dense_detail_in_a_large_outline(self):
+        random = np.random.RandomState(0)
+        # A zigzag crossing itself, 1/1000 of the size of the outline:
+        detail = 500 + random.rand(300, 2) * 0.1
+        coords = np.vstack((
+            [(0, 0), (1000, 0), (1000, 1000), (0, 1000), (0, 0)],
+            detail, [(0, 0)],
+        ))
+        edges, points = PolygonSegment.crossings(svg.PointArray(coords))
+        self.assertEqual(edges.tolist(), self.brute_force(coords))
+        self.assertTrue(len(edges) > 0)
+
+
+if __name__ == '__main__':
+    unittest.main()